@@ -0,0 +1,192 @@
+#----------------------------------------------------------------------------#
+# JSON API (v1).
+#----------------------------------------------------------------------------#
+# Read-only JSON views over the same queries as the HTML pages.
+#
+#   ?fields=a,b      sparse fieldset, only those columns are selected
+#   ?after=<cursor>  continue from the "next" cursor of the previous page
+#   ?per_page=N      page size, capped by MAX_SHOWS_PER_PAGE
+#
+# /venues/<id>/availability and /artists/<id>/availability take
+#   ?start=<datetime>&duration=<minutes>   is this slot free, and what clashes
+#   ?from=<datetime>&days=N&duration=<minutes>   free slots in that window
+#
+# Responses are gzip or brotli compressed when the client accepts it.
+
+import gzip
+from datetime import datetime, timedelta
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from async_queries import venue_detail, artist_detail
+from models import db, Venue, Artist
+from queries import entity_page, shows_page, VENUE_FIELDS, ARTIST_FIELDS, TIMELINE_FIELDS
+from scheduling import get_schedule, MAX_DURATION
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+LISTING_FIELDS = ('id', 'name', 'city', 'state', 'image_link', 'num_upcoming_shows')
+LISTING_DEFAULT = ('id', 'name', 'city', 'state', 'num_upcoming_shows')
+SHOW_FIELDS = ('venue_id', 'venue_name', 'artist_id', 'artist_name',
+	'artist_image_link', 'start_time')
+
+MAX_AVAILABILITY_DAYS = 31
+MAX_FREE_SLOTS = 50
+
+# Smaller bodies are not worth compressing.
+MIN_COMPRESS_SIZE = 500
+
+
+def requested_fields(allowed, default=None):
+	fields = request.args.get('fields')
+	if not fields:
+		return tuple(default or allowed)
+	fields = tuple(dict.fromkeys(field.strip() for field in fields.split(',') if field.strip()))
+	unknown = [field for field in fields if field not in allowed]
+	if unknown:
+		abort(400, f"Unknown fields: {', '.join(unknown)}")
+	return fields
+
+
+def page_size():
+	per_page = request.args.get('per_page', current_app.config['SHOWS_PER_PAGE'], type=int)
+	return max(1, min(per_page, current_app.config['MAX_SHOWS_PER_PAGE']))
+
+
+def listing(model):
+	fields = requested_fields(LISTING_FIELDS, LISTING_DEFAULT)
+	after = request.args.get('after')
+	if after is not None and not after.isdigit():
+		abort(400, 'Invalid cursor')
+	data, next_cursor = entity_page(model, fields,
+		after=int(after) if after else None, per_page=page_size(),
+		genre=request.args.get('genre'))
+	return jsonify(data=data, next=next_cursor)
+
+
+def detail(loader, entity_fields, entity_id):
+	fields = requested_fields(entity_fields + TIMELINE_FIELDS)
+	data = loader(entity_id, past_limit=request.args.get('past', type=int),
+		with_shows=any(field in TIMELINE_FIELDS for field in fields))
+	if data is None:
+		abort(404)
+	return jsonify(data={field: data[field] for field in fields})
+
+
+def datetime_arg(name, default=None):
+	value = request.args.get(name)
+	if not value:
+		return default
+	try:
+		return datetime.fromisoformat(value)
+	except ValueError:
+		abort(400, f'Invalid {name}')
+
+
+def booking_data(booking):
+	return {
+		"show_id": booking.show_id,
+		"venue_id": booking.venue_id,
+		"artist_id": booking.artist_id,
+		"start_time": str(booking.start_time),
+		"end_time": str(booking.end_time)
+	}
+
+
+def availability(model, kind, entity_id):
+	if db.session.query(model.id).filter(model.id == entity_id).first() is None:
+		abort(404)
+	duration = timedelta(minutes=request.args.get('duration', 120, type=int))
+	if not timedelta(0) < duration <= MAX_DURATION:
+		abort(400, 'Invalid duration')
+	schedule = get_schedule()
+
+	start = datetime_arg('start')
+	if start is not None:
+		clashes = schedule.busy(kind, entity_id, start, start + duration)
+		return jsonify(data={
+			"free": not clashes,
+			"conflicts": [booking_data(booking) for booking in clashes]
+		})
+
+	window_start = datetime_arg('from', datetime.today().replace(microsecond=0))
+	days = max(1, min(request.args.get('days', 7, type=int), MAX_AVAILABILITY_DAYS))
+	slots = schedule.free_slots(kind, entity_id, window_start,
+		window_start + timedelta(days=days), duration, limit=MAX_FREE_SLOTS)
+	return jsonify(data=[{"start_time": str(start), "end_time": str(end)} for start, end in slots])
+
+
+@api.route('/venues')
+def venues():
+	return listing(Venue)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+	return detail(venue_detail, VENUE_FIELDS, venue_id)
+
+
+@api.route('/artists')
+def artists():
+	return listing(Artist)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+	return detail(artist_detail, ARTIST_FIELDS, artist_id)
+
+
+@api.route('/shows')
+def shows():
+	fields = requested_fields(SHOW_FIELDS)
+	try:
+		data, next_cursor = shows_page(after=request.args.get('after'), per_page=page_size())
+	except ValueError:
+		abort(400, 'Invalid cursor')
+	return jsonify(data=[{field: show[field] for field in fields} for show in data],
+		next=next_cursor)
+
+
+@api.route('/venues/<int:venue_id>/availability')
+def venue_availability(venue_id):
+	return availability(Venue, 'venue', venue_id)
+
+
+@api.route('/artists/<int:artist_id>/availability')
+def artist_availability(artist_id):
+	return availability(Artist, 'artist', artist_id)
+
+
+# Registered per code too: the app's own 404 handler would win over a
+# class-based one.
+@api.errorhandler(HTTPException)
+@api.errorhandler(400)
+@api.errorhandler(404)
+def api_error(error):
+	return jsonify(error=error.description), error.code
+
+
+@api.after_request
+def compress(response):
+	response.vary.add('Accept-Encoding')
+	if (response.status_code != 200 or response.direct_passthrough
+			or 'Content-Encoding' in response.headers):
+		return response
+	body = response.get_data()
+	if len(body) < MIN_COMPRESS_SIZE:
+		return response
+
+	accepted = request.accept_encodings
+	if brotli is not None and accepted['br']:
+		response.set_data(brotli.compress(body))
+		response.headers['Content-Encoding'] = 'br'
+	elif accepted['gzip']:
+		response.set_data(gzip.compress(body, compresslevel=6))
+		response.headers['Content-Encoding'] = 'gzip'
+	return response
@@ -0,0 +1,190 @@
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+# Listing, search, detail page, create and edit.
+
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, flash, redirect, render_template, request, url_for
+
+from cache import cached_page, conditional_page, invalidate
+from forms import ArtistForm
+from models import db, Venue, Artist, Show, Genre
+from async_queries import artist_detail
+from queries import artist_names, linked_ids, page_version
+from routing import replica_reads
+from search import search
+from streaming import stream_page
+from whats_on import sync as sync_calendar
+
+artists = Blueprint('artists', __name__)
+
+
+@artists.route('/artists')
+@cached_page('artists')
+def index():
+	# (id, name) rows only, read by the template as they are fetched.
+	# ?genre= narrows the list down to one genre.
+	data = artist_names(genre=request.args.get('genre'))
+
+	return stream_page('pages/artists.html', artists=data)
+
+@artists.route('/artists/search', methods=['POST'])
+@replica_reads
+def search_artists():
+	# TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+	# seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
+	# search for "band" should return "The Wild Sax Band".
+	# Matches on name, "city, state" or genres, best match first. A genre
+	# field restricts the hits to that genre.
+	response = search(Artist, request.form.get('search_term', ''),
+		genre=request.values.get('genre'))
+
+	return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+
+def artist_page_version(artist_id):
+	version = page_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id)
+	return version and (version, version[0])
+
+@artists.route('/artists/<int:artist_id>')
+@conditional_page(artist_page_version)
+@cached_page('artist:{artist_id}')
+def show_artist(artist_id):
+	# shows the artist page with the given artist_id
+	# TODO: replace with real artist data from the artist table, using artist_id
+	# Past and upcoming shows, with their venue, come from a single query.
+	# ?past=N only loads the N most recent past shows.
+	data = artist_detail(artist_id, past_limit=request.args.get('past', type=int))
+	if data is None:
+		abort(404)
+
+	return render_template('pages/show_artist.html', artist=data)
+
+
+#  Create Artist
+#  ----------------------------------------------------------------
+
+@artists.route('/artists/create', methods=['GET'])
+def create_artist_form():
+	form = ArtistForm()
+	return render_template('forms/new_artist.html', form=form)
+
+@artists.route('/artists/create', methods=['POST'])
+def create_artist_submission():
+	form = ArtistForm()
+	if form.validate_on_submit():
+		data = {}
+		# called upon submitting the new artist listing form
+		try:
+			# Finds if there is such an artist already stored..
+			artist_old = Artist.query.filter(
+				Artist.name.ilike(f"{request.form['name']}")).first()
+
+			if artist_old is not None:
+				flash('An error occurred. Artist ' + request.form['name'] + ' already exists.', 'error')
+			else:
+				bodyRequest = request.form
+				seeking_venue = True if 'seeking_venue' in bodyRequest.keys() else False
+
+				artist = Artist(
+					name = bodyRequest['name'],
+					city = bodyRequest['city'],
+					state = bodyRequest['state'],
+					phone = bodyRequest['phone'],
+					genres = Genre.resolve(bodyRequest.getlist('genres')),
+					image_link = bodyRequest['image_link'],
+					facebook_link = bodyRequest['facebook_link'],
+					website = bodyRequest['website_link'],
+					seeking_venue = seeking_venue,
+					seeking_description = bodyRequest['seeking_description']
+				)
+				db.session.add(artist)
+				db.session.commit()
+				invalidate('artists')
+				data['name'] = request.form['name']
+				# on successful db insert, flash success
+				flash('Artist ' + data['name'] + ' was successfully listed!')
+
+		except Exception as e:
+			db.session.rollback()
+			current_app.logger.exception('Artist creation failed')
+
+			# TODO: on unsuccessful db insert, flash an error instead.
+			flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+
+		finally:
+			db.session.close()
+		
+		# TODO: modify data to be the data object returned from db insertion
+		return render_template('pages/home.html')
+	else:
+		for field, message in form.errors.items():
+			flash(field + ' - ' + str(message), 'warning')
+			return render_template('forms/new_artist.html', form=form)
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['GET'])
+def edit_artist(artist_id):
+	form = ArtistForm()
+
+	# TODO: populate form with fields from artist with ID <artist_id>
+	artist = {}
+	art = Artist.query.get(artist_id)
+	artist["id"] = art.id
+	artist["name"] = art.name
+	artist["genres"] = art.genre_names
+	artist["city"] = art.city
+	artist["state"] = art.state
+	artist["phone"] = art.phone
+	artist["website"] = art.website
+	artist["facebook_link"] = art.facebook_link
+	artist["seeking_venue"] = art.seeking_venue
+	artist["seeking_description"] = art.seeking_description
+	artist["image_link"] = art.image_link
+	return render_template('forms/edit_artist.html', form=form, artist=artist)
+
+
+@artists.route('/artists/<int:artist_id>/edit', methods=['POST'])
+def edit_artist_submission(artist_id):
+	# TODO: take values from the form submitted, and update existing
+	# artist record with ID <artist_id> using the new attributes
+	form = ArtistForm()
+	artist = Artist.query.get(artist_id)
+	if form.validate_on_submit():
+		bodyRequest = request.form
+		seeking_venue = True if 'seeking_venue' in bodyRequest.keys() else False
+
+		try:
+			artist.name = bodyRequest['name']
+			artist.city = bodyRequest['city']
+			artist.state = bodyRequest['state']
+			artist.phone = bodyRequest['phone']
+			artist.genres = Genre.resolve(bodyRequest.getlist('genres'))
+			# A genre-only edit changes no column, so bump the version here.
+			artist.updated_at = datetime.utcnow()
+			artist.image_link = bodyRequest['image_link']
+			artist.facebook_link = bodyRequest['facebook_link']
+			artist.website = bodyRequest['website_link']
+			artist.seeking_venue = seeking_venue
+			artist.seeking_description = bodyRequest['seeking_description']
+			tags = [f'venue:{v_id}' for v_id in linked_ids(Show.artist_id, Show.venue_id, artist_id)]
+			sync_calendar('artist_id', [artist_id])
+			db.session.commit()
+			invalidate(f'artist:{artist_id}', 'artists', 'shows', 'calendar', *tags)
+			flash("Successfully updated !")
+		except Exception as e:
+			current_app.logger.exception('Artist update failed')
+			db.session.rollback()
+			flash("Failed to update !")
+
+		finally:
+			db.session.close()
+
+		return redirect(url_for('artists.show_artist', artist_id=artist_id))
+	else:
+		for field, message in form.errors.items():
+			flash(field + ' - ' + str(message), 'danger')
+		return render_template('forms/edit_artist.html', form=form, artist=artist)
@@ -0,0 +1,195 @@
+#----------------------------------------------------------------------------#
+# Async reads.
+#----------------------------------------------------------------------------#
+# With ASYNC_READS on, the venue and artist pages (HTML and API) are loaded
+# through SQLAlchemy's asyncio extension instead of the request's session:
+# asyncpg on Postgres, aiosqlite on SQLite, greenlet in both cases. The
+# entity, its genres and its past and upcoming shows are four statements
+# run concurrently on four connections, so a page waits for the slowest
+# of them instead of their sum.
+#
+# Every worker process runs one event loop in a background thread, which
+# owns the async engines and their pools. Request threads hand it their
+# coroutines and wait for the result, so the threads of a gthread worker
+# share one pool and the loop keeps every in-flight request's statements
+# going at once. The loop starts on first use in each process, after
+# gunicorn has forked. The coroutines run in a copy of the request's
+# context, so instrumentation.py counts their statements in the request.
+#
+# Everything else, writes included, stays on the synchronous session. With
+# ASYNC_READS off (the default) the helpers below call queries.py and the
+# async drivers need not be installed.
+#
+# Reads go to a replica when routing.py would send the request there.
+
+import asyncio
+import os
+import random
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from flask import current_app, g
+from sqlalchemy.engine import make_url
+
+import queries
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+
+ASYNC_DRIVERS = {
+	'postgresql': 'postgresql+asyncpg',
+	'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url):
+	url = make_url(url)
+	return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+class AsyncReads:
+
+	def __init__(self, url, replica_urls=(), engine_options=None):
+		self.urls = [async_url(url)] + [async_url(replica) for replica in replica_urls]
+		self.engine_options = engine_options or {}
+		self._pid = None
+		self._lock = threading.Lock()
+
+	def _start(self):
+		if self._pid == os.getpid():
+			return
+		with self._lock:
+			if self._pid != os.getpid():
+				self._spawn()
+
+	def _spawn(self):
+		from sqlalchemy.ext.asyncio import create_async_engine
+
+		self.loop = asyncio.new_event_loop()
+		threading.Thread(target=self.loop.run_forever, name='async-reads', daemon=True).start()
+		engines = [create_async_engine(url, **self.engine_options) for url in self.urls]
+		self.primary, self.replicas = engines[0], engines[1:]
+		self._pid = os.getpid()
+
+	def run(self, coroutine):
+		# Runs the coroutine on this process' loop and waits for it.
+		self._start()
+		return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+	def engine(self):
+		# The engine the current request reads from.
+		self._start()
+		if not self.replicas or not g.get('db_replica'):
+			return self.primary
+		engine = g.get('async_replica')
+		if engine is None:
+			# One replica per request, like RoutingSession.
+			engine = g.async_replica = random.choice(self.replicas)
+		return engine
+
+
+async def _fetch(engine, statement):
+	# Rows of one statement, on a connection of its own.
+	async with engine.connect() as conn:
+		return (await conn.execute(statement)).all()
+
+
+# What a venue or an artist page loads: its columns, its genre links, the
+# show column pointing at it and the other side of its shows.
+Detail = namedtuple('Detail', 'model fields genre_links fk_column other_model other_fk prefix')
+
+DETAILS = {
+	'venue': Detail(Venue, queries.VENUE_FIELDS, venue_genres, Show.venue_id,
+		Artist, Show.artist_id, 'artist'),
+	'artist': Detail(Artist, queries.ARTIST_FIELDS, artist_genres, Show.artist_id,
+		Venue, Show.venue_id, 'venue'),
+}
+
+
+def _statements(detail, entity_id, past_limit, with_shows, now):
+	model, fields, links = detail.model, detail.fields, detail.genre_links
+	statements = [
+		db.select(*[getattr(model, field) for field in fields if field != 'genres']).where(
+			model.id == entity_id),
+		db.select(Genre.name).join(links, links.c.genre_id == Genre.id).where(
+			links.c[detail.fk_column.key] == entity_id).order_by(Genre.name),
+	]
+	if with_shows:
+		# Past shows newest first, upcoming ones soonest first, each with
+		# its full count from a window function, computed before the LIMIT.
+		# At least one past show is read, for its count; load_detail drops
+		# it when past_limit is 0.
+		other = detail.other_model
+		def shows(*criteria):
+			return db.select(
+				Show.start_time, other.id, other.name, other.image_link,
+				db.func.count().over().label('total')
+			).join(other, other.id == detail.other_fk).where(
+				detail.fk_column == entity_id, *criteria)
+
+		past = shows(Show.start_time < now).order_by(Show.start_time.desc(), Show.id.desc())
+		if past_limit is not None:
+			past = past.limit(max(past_limit, 1))
+		statements += [past, shows(Show.start_time >= now).order_by(Show.start_time, Show.id)]
+	return statements
+
+
+async def _gather(engine, statements):
+	return await asyncio.gather(*[_fetch(engine, statement) for statement in statements])
+
+
+def load_detail(reads, kind, entity_id, past_limit=None, with_shows=True):
+	# Same data as queries.venue_detail / artist_detail, or None.
+	detail = DETAILS[kind]
+	statements = _statements(detail, entity_id, past_limit, with_shows, datetime.today())
+	results = reads.run(_gather(reads.engine(), statements))
+
+	entity_rows = results[0]
+	if not entity_rows:
+		return None
+	row = entity_rows[0]._mapping
+	data = {field: row[field] for field in detail.fields if field != 'genres'}
+	if 'genres' in detail.fields:
+		data["genres"] = [genre for genre, in results[1]]
+	if with_shows:
+		prefix = detail.prefix
+		for key, rows in zip(('past', 'upcoming'), results[2:]):
+			shown = rows[:max(past_limit, 0)] if key == 'past' and past_limit is not None else rows
+			data[f"{key}_shows"] = [{
+				f"{prefix}_id": other_id,
+				f"{prefix}_name": other_name,
+				f"{prefix}_image_link": other_image_link,
+				"start_time": str(start_time)
+			} for start_time, other_id, other_name, other_image_link, _ in shown]
+			data[f"{key}_shows_count"] = rows[0].total if rows else 0
+	return data
+
+
+def get_async_reads():
+	return current_app.extensions.get('async_reads')
+
+
+def venue_detail(venue_id, past_limit=None, with_shows=True):
+	# queries.venue_detail, through the async engine when it is on.
+	reads = get_async_reads()
+	if reads is None:
+		return queries.venue_detail(venue_id, past_limit=past_limit, with_shows=with_shows)
+	return load_detail(reads, 'venue', venue_id, past_limit, with_shows)
+
+
+def artist_detail(artist_id, past_limit=None, with_shows=True):
+	# queries.artist_detail, through the async engine when it is on.
+	reads = get_async_reads()
+	if reads is None:
+		return queries.artist_detail(artist_id, past_limit=past_limit, with_shows=with_shows)
+	return load_detail(reads, 'artist', artist_id, past_limit, with_shows)
+
+
+def init_async_reads(app):
+	if not app.config.get('ASYNC_READS'):
+		return None
+	binds = app.config.get('SQLALCHEMY_BINDS') or {}
+	reads = AsyncReads(app.config['SQLALCHEMY_DATABASE_URI'],
+		[binds[bind] for bind in app.config.get('REPLICA_BINDS', ())],
+		app.config.get('ASYNC_ENGINE_OPTIONS'))
+	app.extensions['async_reads'] = reads
+	return reads
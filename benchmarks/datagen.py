@@ -0,0 +1,225 @@
+#----------------------------------------------------------------------------#
+# Synthetic data generator.
+#----------------------------------------------------------------------------#
+# Fills an empty database with N venues, M artists and K shows through the
+# app's own models, then refreshes the derived tables (show summaries and
+# the what's on calendar) the way the cron commands do.
+#
+# The data is skewed the way real listings are: a few cities hold most
+# venues and artists, a few genres most entities, and popular venues and
+# artists play far more shows than the long tail (Zipf weights). Shows sit
+# on a two-hour grid around `now`, so no venue or artist is double-booked.
+#
+# The same seed and sizes give the same rows, ids included, so runs on
+# different commits compare like with like.
+#
+#   python -m benchmarks.datagen --url sqlite:///bench.db --venues 2000 --artists 5000 --shows 100000
+#
+# Point --url at a scratch database: its tables are dropped and recreated.
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import summaries
+import whats_on
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+
+# (city, state), most to least populated.
+CITIES = (
+	('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'),
+	('San Francisco', 'CA'), ('Seattle', 'WA'), ('Austin', 'TX'), ('Nashville', 'TN'),
+	('New Orleans', 'LA'), ('Atlanta', 'GA'), ('Denver', 'CO'), ('Portland', 'OR'),
+	('Boston', 'MA'), ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'),
+	('Miami', 'FL'), ('Phoenix', 'AZ'), ('Memphis', 'TN'), ('Burlington', 'VT'),
+)
+
+# The genre choices of forms.py, most to least common.
+GENRES = (
+	'Rock n Roll', 'Pop', 'Hip-Hop', 'Electronic', 'Jazz', 'Alternative', 'Country',
+	'R&B', 'Folk', 'Blues', 'Soul', 'Punk', 'Heavy Metal', 'Reggae', 'Funk',
+	'Classical', 'Instrumental', 'Musical Theatre', 'Other',
+)
+
+NAME_WORDS = (
+	'Musical', 'Hop', 'Park', 'Square', 'Live', 'Coffee', 'Dueling', 'Pianos', 'Bar',
+	'Guns', 'Petty', 'Matt', 'Quevedo', 'Wild', 'Sax', 'Band', 'Blue', 'Moon', 'Hall',
+	'Room', 'Garden', 'Lounge', 'Echo', 'Velvet', 'Neon', 'River', 'Stone', 'Owl',
+)
+
+SHOW_SLOT = timedelta(hours=2)
+# Shows are spread over this many days either side of `now`.
+SHOW_SPREAD_DAYS = 365
+BATCH_SIZE = 5000
+
+
+def zipf_weights(count, exponent=1.1):
+	return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class Picker:
+	# Weighted choice with the cumulative weights computed once.
+
+	def __init__(self, rnd, population, weights):
+		self.rnd = rnd
+		self.population = population
+		self.cum_weights = list(accumulate(weights))
+
+	def pick(self, k=1):
+		return self.rnd.choices(self.population, cum_weights=self.cum_weights, k=k)
+
+
+def default_now():
+	return datetime.today().replace(minute=0, second=0, microsecond=0)
+
+
+def _name(rnd, index):
+	return f'{rnd.choice(NAME_WORDS)} {rnd.choice(NAME_WORDS)} {index}'
+
+
+def _entities(rnd, count, seeking_column):
+	cities = Picker(rnd, CITIES, zipf_weights(len(CITIES)))
+	rows = []
+	for index in range(1, count + 1):
+		city, state = cities.pick()[0]
+		rows.append({
+			'id': index,
+			'name': _name(rnd, index),
+			'city': city,
+			'state': state,
+			'phone': f'{rnd.randint(200, 999)}-{rnd.randint(100, 999)}-{rnd.randint(1000, 9999)}',
+			'image_link': f'https://images.example.com/{index}.jpg',
+			'facebook_link': f'https://www.facebook.com/{index}',
+			seeking_column: rnd.random() < 0.3,
+			'seeking_description': None,
+		})
+	return rows
+
+
+def _genre_links(rnd, genre_ids, count, entity_column):
+	genres = Picker(rnd, genre_ids, zipf_weights(len(genre_ids), 0.8))
+	links = []
+	for entity_id in range(1, count + 1):
+		for genre_id in set(genres.pick(rnd.randint(1, 3))):
+			links.append({entity_column: entity_id, 'genre_id': genre_id})
+	return links
+
+
+def _shows(rnd, venues, artists, count, now):
+	# Popular venues and artists get most shows; a slot already taken by
+	# the venue or the artist is drawn again.
+	venue_picker = Picker(rnd, range(1, venues + 1), zipf_weights(venues, 0.7))
+	artist_picker = Picker(rnd, range(1, artists + 1), zipf_weights(artists, 0.7))
+	slots = SHOW_SPREAD_DAYS * timedelta(days=1) // SHOW_SLOT
+	taken = set()
+	rows = []
+	attempts = 0
+	while len(rows) < count:
+		attempts += 1
+		if attempts > count * 20:
+			raise ValueError(f'Could only place {len(rows)} shows: add venues or artists')
+		venue_id = venue_picker.pick()[0]
+		artist_id = artist_picker.pick()[0]
+		slot = rnd.randint(-slots, slots)
+		if ('venue', venue_id, slot) in taken or ('artist', artist_id, slot) in taken:
+			continue
+		taken.add(('venue', venue_id, slot))
+		taken.add(('artist', artist_id, slot))
+		start_time = now + slot * SHOW_SLOT
+		rows.append({
+			'id': len(rows) + 1,
+			'venue_id': venue_id,
+			'artist_id': artist_id,
+			'start_time': start_time,
+			'end_time': start_time + SHOW_SLOT,
+		})
+	return rows
+
+
+def _insert(table, rows):
+	for offset in range(0, len(rows), BATCH_SIZE):
+		db.session.execute(table.insert(), rows[offset:offset + BATCH_SIZE])
+
+
+def generate(venues, artists, shows, seed=0, now=None):
+	# Inserts the rows in the app's database (inside an app context) and
+	# commits. Returns the row counts.
+	now = now or default_now()
+	rnd = random.Random(seed)
+	timestamps = {'updated_at': now}
+
+	_insert(Genre.__table__, [{'id': index, 'name': name} for index, name in enumerate(GENRES, 1)])
+	genre_ids = list(range(1, len(GENRES) + 1))
+	venue_rows = _entities(rnd, venues, 'seeking_talent')
+	for row in venue_rows:
+		row.update(timestamps, address=f'{rnd.randint(1, 9999)} Main Street',
+			website=None)
+	_insert(Venue.__table__, venue_rows)
+	artist_rows = _entities(rnd, artists, 'seeking_venue')
+	for row in artist_rows:
+		row.update(timestamps, website=None)
+	_insert(Artist.__table__, artist_rows)
+	_insert(venue_genres, _genre_links(rnd, genre_ids, venues, 'venue_id'))
+	_insert(artist_genres, _genre_links(rnd, genre_ids, artists, 'artist_id'))
+	show_rows = _shows(rnd, venues, artists, shows, now)
+	for row in show_rows:
+		row.update(timestamps)
+	_insert(Show.__table__, show_rows)
+
+	if db.session.get_bind().dialect.name == 'postgresql':
+		# Explicit ids leave the sequences behind.
+		for table in ('genre', '"Venue"', '"Artist"', 'show'):
+			db.session.execute(db.text(
+				f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+
+	summaries.refresh(Venue, now=now)
+	summaries.refresh(Artist, now=now)
+	whats_on.refresh(now.date())
+	db.session.commit()
+	return {'genres': len(GENRES), 'venues': venues, 'artists': artists, 'shows': shows}
+
+
+def load_app(url, **settings):
+	# The app configured for benchmarking against `url`.
+	from app import create_app
+
+	return create_app(**{
+		'SQLALCHEMY_DATABASE_URI': url,
+		'SECRET_KEY': 'benchmark',
+		'WTF_CSRF_ENABLED': False,
+		'CACHE_TYPE': 'null',
+		'SLOW_QUERY_MS': None,
+		'LOG_LEVEL': 'WARNING',
+		**settings
+	})
+
+
+def add_size_arguments(parser):
+	parser.add_argument('--url', default='sqlite:///bench.db')
+	parser.add_argument('--venues', type=int, default=500)
+	parser.add_argument('--artists', type=int, default=1000)
+	parser.add_argument('--shows', type=int, default=20000)
+	parser.add_argument('--seed', type=int, default=0)
+
+
+def reset(app, args):
+	# Drops and recreates the tables of the app's database, then fills it.
+	with app.app_context():
+		db.drop_all()
+		db.create_all()
+		return generate(args.venues, args.artists, args.shows, seed=args.seed)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Synthetic data generator")
+	add_size_arguments(parser)
+	args = parser.parse_args()
+
+	app = load_app(args.url)
+	counts = reset(app, args)
+	print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,166 @@
+#----------------------------------------------------------------------------#
+# Endpoint benchmark.
+#----------------------------------------------------------------------------#
+# Fills a scratch database with benchmarks.datagen, then requests every
+# endpoint through the Flask test client: no network or server in the way,
+# so the figures are the app's own cost. For each endpoint it records p50,
+# p95 and p99 latency, the median time to the first byte of the body and
+# the SQL statements per request. Bodies are read as they come and thrown
+# away, as a client would.
+#
+#   python -m benchmarks.endpoints --shows 100000 --output before.json
+#   git checkout other-branch
+#   python -m benchmarks.endpoints --shows 100000 --output after.json
+#   python -m benchmarks.results before.json after.json
+#
+# The page cache is off unless --cache lru, so every request reaches the
+# database. --reuse skips the data generation when the database was
+# already filled with the same sizes. The exit status is 1 when any
+# request failed, so a small run doubles as a smoke test (`fab test`).
+#
+# --memory adds the peak Python memory of one more request per endpoint,
+# traced apart from the timed ones since tracing slows everything down.
+# The listings at 100k rows:
+#
+#   python -m benchmarks.endpoints --venues 100000 --artists 100000 --shows 100000 \
+#       --memory --only venues --only artists --only 'search venues' --only 'search artists'
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from urllib.parse import quote
+
+from sqlalchemy import event
+
+from benchmarks.datagen import CITIES, GENRES, NAME_WORDS, add_size_arguments, default_now, load_app, reset
+from benchmarks.results import run_metadata, summarize, write_results
+from models import db
+
+# name: callable(rnd, sizes) -> (method, path, form data or None), sizes
+# having the venue and artist counts. load.py runs the same requests.
+ENDPOINTS = {
+	'home': lambda rnd, sizes: ('GET', '/', None),
+	'calendar': lambda rnd, sizes: ('GET', '/calendar', None),
+	'calendar by city': lambda rnd, sizes: ('GET', f'/calendar?city={quote(rnd.choice(CITIES)[0])}', None),
+	'venues': lambda rnd, sizes: ('GET', '/venues', None),
+	'venues by genre': lambda rnd, sizes: ('GET', f'/venues?genre={quote(rnd.choice(GENRES))}', None),
+	'artists': lambda rnd, sizes: ('GET', '/artists', None),
+	'shows': lambda rnd, sizes: ('GET', '/shows', None),
+	'venue': lambda rnd, sizes: ('GET', f'/venues/{rnd.randint(1, sizes.venues)}', None),
+	'artist': lambda rnd, sizes: ('GET', f'/artists/{rnd.randint(1, sizes.artists)}', None),
+	'search venues': lambda rnd, sizes: ('POST', '/venues/search',
+		{'search_term': rnd.choice(NAME_WORDS).lower()}),
+	'search artists': lambda rnd, sizes: ('POST', '/artists/search',
+		{'search_term': rnd.choice(NAME_WORDS).lower()}),
+	'api venues': lambda rnd, sizes: ('GET', '/api/v1/venues', None),
+	'api shows': lambda rnd, sizes: ('GET', '/api/v1/shows', None),
+	'api venue': lambda rnd, sizes: ('GET', f'/api/v1/venues/{rnd.randint(1, sizes.venues)}', None),
+	'api venue availability': lambda rnd, sizes: ('GET',
+		f'/api/v1/venues/{rnd.randint(1, sizes.venues)}/availability'
+		f'?from={quote(default_now().isoformat())}&days=7', None),
+}
+
+
+class QueryCounter:
+
+	def __init__(self, engine):
+		self.count = 0
+		event.listen(engine, 'before_cursor_execute', self._count)
+
+	def _count(self, conn, cursor, statement, parameters, context, executemany):
+		self.count += 1
+
+
+def request(client, method, url, form):
+	# (response, seconds to the first chunk of the body, total seconds)
+	start = time.perf_counter()
+	response = client.open(url, method=method, data=form, buffered=False)
+	chunks = iter(response.response)
+	next(chunks, None)
+	first_byte = time.perf_counter() - start
+	for _ in chunks:
+		pass
+	elapsed = time.perf_counter() - start
+	response.close()
+	return response, first_byte, elapsed
+
+
+def run_endpoint(client, counter, name, args):
+	# Every endpoint draws the same ids and terms on every run.
+	rnd = random.Random(f'{args.seed}:{name}')
+	timings = []
+	first_bytes = []
+	queries = []
+	errors = 0
+	for iteration in range(args.warmup + args.repeat):
+		method, url, form = ENDPOINTS[name](rnd, args)
+		before = counter.count
+		response, first_byte, elapsed = request(client, method, url, form)
+		if iteration < args.warmup:
+			continue
+		timings.append(elapsed)
+		first_bytes.append(first_byte)
+		queries.append(counter.count - before)
+		if response.status_code >= 400:
+			errors += 1
+	queries.sort()
+	first_bytes.sort()
+	return summarize(timings, errors, queries=queries[len(queries) // 2],
+		queries_max=queries[-1],
+		first_byte_p50_ms=round(first_bytes[len(first_bytes) // 2] * 1000, 3))
+
+
+def peak_memory(client, name, args):
+	# Peak KiB allocated while answering one request of the endpoint.
+	method, url, form = ENDPOINTS[name](random.Random(f'{args.seed}:{name}'), args)
+	tracemalloc.start()
+	try:
+		request(client, method, url, form)
+		return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+	finally:
+		tracemalloc.stop()
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Endpoint benchmark")
+	add_size_arguments(parser)
+	parser.add_argument('--repeat', type=int, default=50)
+	parser.add_argument('--warmup', type=int, default=3)
+	parser.add_argument('--cache', default='null', choices=('null', 'lru'))
+	parser.add_argument('--reuse', action='store_true',
+		help="use the data already in the database")
+	parser.add_argument('--only', action='append', choices=sorted(ENDPOINTS),
+		help="benchmark only this endpoint (repeatable)")
+	parser.add_argument('--memory', action='store_true',
+		help="also record each endpoint's peak memory per request")
+	parser.add_argument('--output', help="JSON results file, stdout by default")
+	args = parser.parse_args()
+
+	app = load_app(args.url, CACHE_TYPE=args.cache)
+	if not args.reuse:
+		reset(app, args)
+
+	results = {}
+	with app.app_context():
+		counter = QueryCounter(db.engine)
+		dialect = db.engine.dialect.name
+		client = app.test_client()
+		for name in args.only or ENDPOINTS:
+			results[name] = run_endpoint(client, counter, name, args)
+			if args.memory:
+				results[name]['peak_kib'] = peak_memory(client, name, args)
+
+	write_results({
+		'benchmark': 'endpoints',
+		'meta': run_metadata(database=dialect, cache=args.cache, seed=args.seed,
+			repeat=args.repeat, sizes={'venues': args.venues, 'artists': args.artists,
+				'shows': args.shows}),
+		'results': results,
+	}, args.output)
+	sys.exit(1 if any(result['errors'] for result in results.values()) else 0)
+
+
+if __name__ == '__main__':
+	main()
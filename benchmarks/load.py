@@ -0,0 +1,144 @@
+#----------------------------------------------------------------------------#
+# Load scenario.
+#----------------------------------------------------------------------------#
+# Simulated visitors against a running server: each one loops over weighted
+# requests from benchmarks.endpoints (browse the listings, open a venue or
+# an artist, search, check availability) with a think time between them,
+# like a locust user.
+#
+#   python -m benchmarks.datagen --url postgresql://.../scratch
+#   gunicorn --preload -w 4 wsgi:app &
+#   python -m benchmarks.load --host http://127.0.0.1:8000 --users 50 --duration 60 --output load.json
+#
+# --venues and --artists must match the generated data. The same scenario
+# runs under locust for distributed runs and its web UI:
+#
+#   locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000
+
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from itertools import accumulate
+
+from benchmarks.endpoints import ENDPOINTS
+from benchmarks.results import run_metadata, summarize, write_results
+
+
+class Sizes:
+	# The generated data sizes the requests pick ids from.
+
+	def __init__(self, venues, artists):
+		self.venues = venues
+		self.artists = artists
+
+
+# (endpoint, weight): mostly detail pages and listings, as on the live site.
+SCENARIO = (
+	('venue', 20),
+	('artist', 20),
+	('venues', 10),
+	('artists', 10),
+	('shows', 8),
+	('calendar by city', 8),
+	('venues by genre', 6),
+	('search venues', 6),
+	('search artists', 6),
+	('api venue availability', 6),
+)
+
+CUM_WEIGHTS = list(accumulate(weight for _, weight in SCENARIO))
+
+
+def pick_endpoint(rnd):
+	return rnd.choices(SCENARIO, cum_weights=CUM_WEIGHTS)[0][0]
+
+
+class Stats:
+
+	def __init__(self):
+		self.timings = {}
+		self.errors = {}
+		self._lock = threading.Lock()
+
+	def record(self, name, seconds, failed):
+		with self._lock:
+			self.timings.setdefault(name, []).append(seconds)
+			self.errors[name] = self.errors.get(name, 0) + failed
+
+
+def visitor(host, sizes, stats, deadline, seed, wait):
+	rnd = random.Random(seed)
+	while time.monotonic() < deadline:
+		name = pick_endpoint(rnd)
+		method, path, form = ENDPOINTS[name](rnd, sizes)
+		data = urllib.parse.urlencode(form).encode() if form is not None else None
+		request = urllib.request.Request(host + path, data=data, method=method)
+		start = time.perf_counter()
+		try:
+			with urllib.request.urlopen(request, timeout=30) as response:
+				response.read()
+			failed = False
+		except (urllib.error.URLError, OSError):
+			failed = True
+		stats.record(name, time.perf_counter() - start, failed)
+		time.sleep(rnd.uniform(*wait))
+
+
+def run(host, sizes, users, duration, seed=0, wait=(0.5, 2.0), ramp_up=0.0):
+	# Runs `users` visitors for `duration` seconds; returns the results.
+	stats = Stats()
+	started = time.monotonic()
+	deadline = started + duration
+	threads = []
+	for user in range(users):
+		thread = threading.Thread(target=visitor, daemon=True,
+			args=(host.rstrip('/'), sizes, stats, deadline, f'{seed}:{user}', wait))
+		thread.start()
+		threads.append(thread)
+		if ramp_up:
+			time.sleep(ramp_up / users)
+	for thread in threads:
+		thread.join()
+	elapsed = time.monotonic() - started
+
+	results = {}
+	for name, timings in sorted(stats.timings.items()):
+		results[name] = summarize(timings, stats.errors[name],
+			rps=round(len(timings) / elapsed, 2))
+	everything = [timing for timings in stats.timings.values() for timing in timings]
+	results['total'] = summarize(everything, sum(stats.errors.values()),
+		rps=round(len(everything) / elapsed, 2))
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Load scenario against a running server")
+	parser.add_argument('--host', default='http://127.0.0.1:5000')
+	parser.add_argument('--users', type=int, default=20)
+	parser.add_argument('--duration', type=float, default=60, help="seconds")
+	parser.add_argument('--ramp-up', type=float, default=0, help="seconds to start every user")
+	parser.add_argument('--wait', type=float, nargs=2, default=(0.5, 2.0),
+		metavar=('MIN', 'MAX'), help="think time between requests, seconds")
+	parser.add_argument('--venues', type=int, default=500)
+	parser.add_argument('--artists', type=int, default=1000)
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--output', help="JSON results file, stdout by default")
+	args = parser.parse_args()
+
+	results = run(args.host, Sizes(args.venues, args.artists), args.users, args.duration,
+		seed=args.seed, wait=tuple(args.wait), ramp_up=args.ramp_up)
+	write_results({
+		'benchmark': 'load',
+		'meta': run_metadata(host=args.host, users=args.users, duration=args.duration,
+			wait=args.wait, seed=args.seed,
+			sizes={'venues': args.venues, 'artists': args.artists}),
+		'results': results,
+	}, args.output)
+
+
+if __name__ == '__main__':
+	main()
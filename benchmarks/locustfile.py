@@ -0,0 +1,37 @@
+#----------------------------------------------------------------------------#
+# Locust scenario.
+#----------------------------------------------------------------------------#
+# benchmarks.load's scenario as a locust user, for distributed runs and the
+# web UI. Needs locust (pip install locust), which the app itself does not.
+#
+#   BENCH_VENUES=500 BENCH_ARTISTS=1000 locust -f benchmarks/locustfile.py --host http://127.0.0.1:8000
+#   locust -f benchmarks/locustfile.py --host ... --headless -u 50 -r 5 -t 60s --json > load.json
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from locust import HttpUser, between
+
+from benchmarks.endpoints import ENDPOINTS
+from benchmarks.load import SCENARIO, Sizes
+
+SIZES = Sizes(int(os.environ.get('BENCH_VENUES', '500')), int(os.environ.get('BENCH_ARTISTS', '1000')))
+
+
+def task(name):
+	def run(user):
+		method, path, form = ENDPOINTS[name](user.rnd, SIZES)
+		user.client.request(method, path, data=form, name=name)
+	run.__name__ = name.replace(' ', '_')
+	return run
+
+
+class Visitor(HttpUser):
+	wait_time = between(0.5, 2.0)
+	tasks = {task(name): weight for name, weight in SCENARIO}
+
+	def on_start(self):
+		self.rnd = random.Random()
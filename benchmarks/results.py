@@ -0,0 +1,129 @@
+#----------------------------------------------------------------------------#
+# Benchmark results.
+#----------------------------------------------------------------------------#
+# endpoints.py and load.py write one JSON document per run:
+#
+#   {"benchmark": ..., "meta": {commit, python, database, sizes, ...},
+#    "results": {name: {"requests", "errors", "p50_ms", "p99_ms", ...}}}
+#
+# and this module compares two of them, run on different commits:
+#
+#   python -m benchmarks.results before.json after.json --threshold 10
+#
+# It prints the change of every figure and exits with status 1 when a
+# latency or peak memory grew by more than --threshold percent or a query
+# count grew.
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
+
+# Figures compared between runs; all of them are better lower.
+COMPARED = ('p50_ms', 'p99_ms', 'first_byte_p50_ms', 'queries', 'peak_kib')
+
+
+def percentile(ordered, fraction):
+	# Nearest rank on sorted values.
+	if not ordered:
+		return 0.0
+	return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(timings, errors=0, **extra):
+	# Latency figures, in milliseconds, of a list of timings in seconds.
+	ordered = sorted(timing * 1000 for timing in timings)
+	data = {
+		'requests': len(ordered),
+		'errors': errors,
+		'p50_ms': round(percentile(ordered, 0.5), 3),
+		'p95_ms': round(percentile(ordered, 0.95), 3),
+		'p99_ms': round(percentile(ordered, 0.99), 3),
+		'mean_ms': round(statistics.fmean(ordered), 3) if ordered else 0.0,
+		'max_ms': round(ordered[-1], 3) if ordered else 0.0,
+	}
+	data.update(extra)
+	return data
+
+
+def _git(*args):
+	try:
+		return subprocess.run(('git',) + args, capture_output=True, text=True,
+			check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def run_metadata(**extra):
+	data = {
+		'commit': _git('rev-parse', 'HEAD'),
+		'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+		'time': datetime.now(timezone.utc).isoformat(),
+		'python': platform.python_version(),
+		'sqlalchemy': sa.__version__,
+		'platform': platform.platform(),
+	}
+	data.update(extra)
+	return data
+
+
+def write_results(data, path=None):
+	text = json.dumps(data, indent=2, default=str)
+	if path is None or path == '-':
+		print(text)
+	else:
+		with open(path, 'w') as file:
+			file.write(text + '\n')
+
+
+def compare(before, after, threshold):
+	# Lines describing every change, and whether any is a regression.
+	lines = []
+	regressed = False
+	for name, new in after['results'].items():
+		old = before['results'].get(name)
+		if old is None:
+			lines.append(f'{name}: new')
+			continue
+		changes = []
+		for key in COMPARED:
+			if key not in old or key not in new:
+				continue
+			if key == 'queries':
+				worse = new[key] > old[key]
+			else:
+				worse = old[key] > 0 and (new[key] - old[key]) / old[key] * 100 > threshold
+			change = f'{key} {old[key]} -> {new[key]}'
+			changes.append(change + (' REGRESSION' if worse else ''))
+			regressed = regressed or worse
+		lines.append(f'{name}: ' + ', '.join(changes))
+	for name in before['results'].keys() - after['results'].keys():
+		lines.append(f'{name}: gone')
+	return lines, regressed
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Compare two benchmark results")
+	parser.add_argument('before')
+	parser.add_argument('after')
+	parser.add_argument('--threshold', type=float, default=10.0,
+		help="latency or memory growth, in percent, counted as a regression")
+	args = parser.parse_args()
+
+	with open(args.before) as file:
+		before = json.load(file)
+	with open(args.after) as file:
+		after = json.load(file)
+	print(f'{before["meta"].get("commit")} -> {after["meta"].get("commit")}')
+	lines, regressed = compare(before, after, args.threshold)
+	print('\n'.join(lines))
+	sys.exit(1 if regressed else 0)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,151 @@
+#----------------------------------------------------------------------------#
+# Show index benchmark.
+#----------------------------------------------------------------------------#
+# Seeds a synthetic show table, then times the hot show queries and prints
+# their plans, first without and then with the indexes declared on
+# models.Show.
+#
+#   python -m benchmarks.show_indexes --shows 500000
+#   python -m benchmarks.show_indexes --url postgresql://user:pw@localhost/scratch
+#
+# Point --url at a scratch database: the show_bench table is dropped and
+# recreated on every run.
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from models import Show
+
+NOW = datetime(2026, 1, 1, 20, 0)
+
+QUERIES = {
+	'venue upcoming count': (
+		'SELECT count(*) FROM show_bench WHERE venue_id = :venue_id AND start_time >= :now',
+		lambda rnd, args: {'venue_id': rnd.randint(1, args.venues), 'now': NOW}
+	),
+	'artist past shows': (
+		'SELECT id, venue_id, start_time FROM show_bench'
+		' WHERE artist_id = :artist_id AND start_time < :now ORDER BY start_time DESC',
+		lambda rnd, args: {'artist_id': rnd.randint(1, args.artists), 'now': NOW}
+	),
+	'listing page': (
+		'SELECT id, venue_id, artist_id, start_time FROM show_bench'
+		' WHERE (start_time, id) < (:start_time, :id) ORDER BY start_time DESC, id DESC LIMIT 30',
+		lambda rnd, args: {
+			'start_time': NOW + timedelta(hours=rnd.randint(-17520, 17520)),
+			'id': args.shows
+		}
+	),
+}
+
+
+def build_table(metadata):
+	# Same columns as models.Show, without the foreign keys so
+	# the benchmark does not need the Venue and Artist tables.
+	table = sa.Table(
+		'show_bench', metadata,
+		sa.Column('id', sa.Integer, primary_key=True),
+		sa.Column('venue_id', sa.Integer, nullable=False),
+		sa.Column('artist_id', sa.Integer, nullable=False),
+		sa.Column('start_time', sa.DateTime, nullable=False),
+	)
+	return table
+
+
+def build_indexes(table):
+	# Built once the table exists, so create_all does not create them.
+	return [
+		sa.Index(index.name.replace('ix_show_', 'ix_show_bench_'),
+			*[table.c[column.name] for column in index.columns])
+		for index in Show.__table__.indexes
+	]
+
+
+def seed(engine, table, args):
+	rnd = random.Random(args.seed)
+	batch = []
+	with engine.begin() as conn:
+		for show_id in range(1, args.shows + 1):
+			batch.append({
+				'id': show_id,
+				'venue_id': rnd.randint(1, args.venues),
+				'artist_id': rnd.randint(1, args.artists),
+				# Two years either side of NOW, hour granularity.
+				'start_time': NOW + timedelta(hours=rnd.randint(-17520, 17520)),
+			})
+			if len(batch) == 10000:
+				conn.execute(table.insert(), batch)
+				batch = []
+		if batch:
+			conn.execute(table.insert(), batch)
+
+
+def explain(conn, sql, params):
+	if conn.dialect.name == 'postgresql':
+		rows = conn.execute(sa.text('EXPLAIN ' + sql), params)
+		return '\n'.join(row[0] for row in rows)
+	rows = conn.execute(sa.text('EXPLAIN QUERY PLAN ' + sql), params)
+	return '\n'.join(str(row[-1]) for row in rows)
+
+
+def run_queries(engine, args):
+	results = {}
+	with engine.connect() as conn:
+		for name, (sql, make_params) in QUERIES.items():
+			rnd = random.Random(args.seed)
+			timings = []
+			for _ in range(args.repeat):
+				params = make_params(rnd, args)
+				start = time.perf_counter()
+				conn.execute(sa.text(sql), params).fetchall()
+				timings.append((time.perf_counter() - start) * 1000)
+			results[name] = {
+				'median_ms': statistics.median(timings),
+				'plan': explain(conn, sql, make_params(rnd, args)),
+			}
+	return results
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Show index benchmark")
+	parser.add_argument('--url', default='sqlite:///show_bench.db')
+	parser.add_argument('--shows', type=int, default=200000)
+	parser.add_argument('--venues', type=int, default=2000)
+	parser.add_argument('--artists', type=int, default=5000)
+	parser.add_argument('--repeat', type=int, default=50)
+	parser.add_argument('--seed', type=int, default=0)
+	args = parser.parse_args()
+
+	engine = sa.create_engine(args.url)
+	metadata = sa.MetaData()
+	table = build_table(metadata)
+	metadata.drop_all(engine)
+	metadata.create_all(engine)
+	indexes = build_indexes(table)
+	print(f'Seeding {args.shows} shows ...')
+	seed(engine, table, args)
+
+	before = run_queries(engine, args)
+	with engine.begin() as conn:
+		for index in indexes:
+			index.create(conn)
+		conn.execute(sa.text('ANALYZE show_bench'))
+	after = run_queries(engine, args)
+
+	for name in QUERIES:
+		print(f'\n== {name}')
+		print(f'   without indexes: {before[name]["median_ms"]:9.3f} ms')
+		print(f'   with indexes:    {after[name]["median_ms"]:9.3f} ms')
+		print('   plan without indexes:')
+		print('     ' + before[name]['plan'].replace('\n', '\n     '))
+		print('   plan with indexes:')
+		print('     ' + after[name]['plan'].replace('\n', '\n     '))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,100 @@
+#----------------------------------------------------------------------------#
+# Startup benchmark.
+#----------------------------------------------------------------------------#
+# Times a cold start in fresh interpreters: importing app.py, then
+# create_app(), which imports the views and builds the app, as wsgi.py does.
+# One more run is made under `python -X importtime` to list the slowest
+# imports.
+#
+#   python -m benchmarks.startup --output startup.json
+#   python -m benchmarks.results before.json startup.json
+#
+# create_app() never connects, so the database need not be reachable, but
+# its driver must be installed; --url points the app elsewhere.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.results import run_metadata, summarize, write_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app(**json.loads(sys.argv[1]))
+built = time.perf_counter()
+print(json.dumps({
+	"import": imported - start,
+	"create_app": built - imported,
+	"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+	"modules": len(sys.modules),
+}))
+'''
+
+
+def probe(settings, importtime=False):
+	command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [
+		'-c', PROBE, json.dumps(settings)]
+	result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+	return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(stderr):
+	# [(module, self_us, cumulative_us, depth)] from -X importtime output.
+	imports = []
+	for line in stderr.splitlines():
+		if not line.startswith('import time:') or 'self [us]' in line:
+			continue
+		self_us, cumulative_us, name = line[len('import time:'):].split('|')
+		depth = (len(name) - len(name.lstrip())) // 2
+		imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+	return imports
+
+
+def slowest_imports(imports, top):
+	# The costliest imports the app itself asked for (depth 1 under
+	# `import app` or create_app()), by cumulative time.
+	first = min((depth for _, _, _, depth in imports), default=0)
+	direct = [entry for entry in imports if entry[3] <= first + 1]
+	direct.sort(key=lambda entry: -entry[2])
+	return [{'module': name, 'cumulative_ms': round(cumulative / 1000, 3),
+		'self_ms': round(own / 1000, 3)} for name, own, cumulative, _ in direct[:top]]
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Startup benchmark")
+	parser.add_argument('--repeat', type=int, default=10)
+	parser.add_argument('--url', help="database URL, the configured one by default")
+	parser.add_argument('--migrate', action='store_true',
+		help="load Flask-Migrate, as `flask` commands do; wsgi.py does not")
+	parser.add_argument('--top', type=int, default=15)
+	parser.add_argument('--output', help="JSON results file, stdout by default")
+	args = parser.parse_args()
+
+	settings = {'SECRET_KEY': 'benchmark', 'MIGRATE': args.migrate}
+	if args.url:
+		settings['SQLALCHEMY_DATABASE_URI'] = args.url
+
+	runs = [probe(settings)[0] for _ in range(args.repeat)]
+	profiled, stderr = probe(settings, importtime=True)
+	write_results({
+		'benchmark': 'startup',
+		'meta': run_metadata(repeat=args.repeat, modules=profiled['modules'],
+			max_rss_kb=max(run['max_rss_kb'] for run in runs),
+			slowest_imports=slowest_imports(parse_importtime(stderr), args.top)),
+		'results': {
+			'import app': summarize([run['import'] for run in runs]),
+			'create_app': summarize([run['create_app'] for run in runs]),
+			'total': summarize([run['import'] + run['create_app'] for run in runs]),
+		},
+	}, args.output)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,98 @@
+#----------------------------------------------------------------------------#
+# Bulk import and export.
+#----------------------------------------------------------------------------#
+# HTTP and command line front ends of importer.py and exporter.py. The HTTP
+# import and export answer only INTERNAL_ALLOWED_ADDRS, like /internal.
+
+import json
+
+import click
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+
+from importer import run_import, open_text, CHUNK_SIZE
+from exporter import EXPORTS, STREAM_FORMATS, iter_records, write_parquet
+from internal import internal_only
+
+# cli_group=None keeps the commands top-level: `flask import`, `flask export`.
+bulk = Blueprint('bulk', __name__, cli_group=None)
+
+
+#  Bulk import
+#  ----------------------------------------------------------------
+
+@bulk.route('/import/<kind>', methods=['POST'])
+@internal_only
+def import_upload(kind):
+	# Streams an uploaded CSV/JSONL file ('file' field) through the bulk
+	# importer and returns its report as JSON.
+	upload = request.files.get('file')
+	if kind not in ('venues', 'artists', 'shows') or upload is None:
+		abort(400)
+	fmt = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+	if fmt not in ('csv', 'jsonl'):
+		abort(400)
+	report = run_import(kind, open_text(upload.stream), fmt)
+	return jsonify(report.as_dict())
+
+@bulk.cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']),
+	help='Defaults to the file extension.')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True)
+@click.option('--errors', 'errors_path', type=click.Path(dir_okay=False),
+	help='Write per-row errors to this file as JSON lines.')
+def import_command(kind, path, fmt, chunk_size, errors_path):
+	"""Bulk import venues, artists or shows from CSV or JSON lines."""
+	fmt = fmt or path.rsplit('.', 1)[-1].lower()
+	errors_file = open(errors_path, 'w') if errors_path else None
+
+	def on_error(line, messages):
+		if errors_file is not None:
+			errors_file.write(json.dumps({"line": line, "errors": messages}) + '\n')
+
+	def on_progress(report):
+		click.echo(f'{report.rows} rows: {report.inserted} inserted, '
+			f'{report.duplicates} duplicates, {report.failed} failed', err=True)
+
+	try:
+		with open(path, encoding='utf-8', newline='') as stream:
+			report = run_import(kind, stream, fmt, chunk_size, on_error, on_progress)
+	finally:
+		if errors_file is not None:
+			errors_file.close()
+	click.echo(json.dumps({key: value for key, value in report.as_dict().items() if key != 'errors'}))
+
+
+#  Bulk export
+#  ----------------------------------------------------------------
+
+@bulk.route('/export/<kind>')
+@internal_only
+def export_download(kind):
+	# Streams the whole catalog of one kind; ?format=csv (default) or jsonl.
+	fmt = request.args.get('format', 'csv')
+	if kind not in EXPORTS or fmt not in STREAM_FORMATS:
+		abort(400)
+	chunks, mimetype = STREAM_FORMATS[fmt]
+	return Response(stream_with_context(chunks(kind, iter_records(kind))),
+		mimetype=mimetype,
+		headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
+@bulk.cli.command('export')
+@click.argument('kind', type=click.Choice(list(EXPORTS)))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl', 'parquet']), default='csv', show_default=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False, allow_dash=True), default='-',
+	help='Output file, stdout by default (not for parquet).')
+def export_command(kind, fmt, output):
+	"""Stream all venues, artists or shows to CSV, JSON lines or Parquet."""
+	records = iter_records(kind)
+	if fmt == 'parquet':
+		if output == '-':
+			raise click.UsageError('parquet needs an --output file')
+		write_parquet(kind, records, output)
+		return
+	chunks, _ = STREAM_FORMATS[fmt]
+	with click.open_file(output, 'w', encoding='utf-8') as stream:
+		for chunk in chunks(kind, records):
+			stream.write(chunk)
@@ -0,0 +1,235 @@
+#----------------------------------------------------------------------------#
+# Cache.
+#----------------------------------------------------------------------------#
+# Rendered-page cache for the read views, with an in-process LRU backend
+# and a Redis-compatible one. Tag versions live in the backend, so only a
+# shared backend (Redis) invalidates the pages of every worker: the LRU one
+# is for single-process servers, and caching is off unless configured.
+#
+# Cached pages are tagged per entity ('venue:3', 'artist:7') or listing
+# ('venues', 'artists', 'shows'). Each tag has a version token stored in the
+# backend and every page key embeds the versions of its tags, so a write
+# invalidates exactly the affected pages by bumping their tags: the old
+# entries are never read again and age out on their own.
+#
+# Cache misses are rendered from the primary, not a read replica
+# (routing.py): cache hits skip the database, so only a body that is fresh
+# as of its tag versions may be stored.
+#
+# Streamed pages (streaming.py) are stored once fully sent, unless they grew
+# past CACHE_MAX_STREAMED_CHARS: keeping those whole would undo the point of
+# streaming them.
+
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, session
+
+
+class NullCache:
+	# Caching disabled.
+
+	def get_many(self, keys):
+		return [None] * len(keys)
+
+	def set(self, key, value, ttl=None):
+		pass
+
+	def delete(self, key):
+		pass
+
+
+class LRUCache:
+	# Thread-safe in-process cache bounded in entries, with a per-entry TTL.
+
+	def __init__(self, max_entries=1024, default_ttl=60, clock=time.monotonic):
+		self.max_entries = max_entries
+		self.default_ttl = default_ttl
+		self.clock = clock
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get_many(self, keys):
+		now = self.clock()
+		values = []
+		with self._lock:
+			for key in keys:
+				entry = self._entries.get(key)
+				if entry is None or (entry[1] is not None and entry[1] <= now):
+					self._entries.pop(key, None)
+					values.append(None)
+				else:
+					self._entries.move_to_end(key)
+					values.append(entry[0])
+		return values
+
+	def set(self, key, value, ttl=None):
+		ttl = self.default_ttl if ttl is None else ttl
+		expires = self.clock() + ttl if ttl else None
+		with self._lock:
+			self._entries[key] = (value, expires)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+
+	def delete(self, key):
+		with self._lock:
+			self._entries.pop(key, None)
+
+
+class RedisCache:
+	# Any client with Redis' get/mget/set(ex=)/delete commands works, which
+	# lets a local stand-in (e.g. fakeredis) replace a server.
+
+	def __init__(self, client, default_ttl=60, prefix='fyyur:'):
+		self.client = client
+		self.default_ttl = default_ttl
+		self.prefix = prefix
+
+	@classmethod
+	def from_url(cls, url, **kwargs):
+		import redis
+		return cls(redis.Redis.from_url(url), **kwargs)
+
+	def get_many(self, keys):
+		values = self.client.mget([self.prefix + key for key in keys])
+		return [None if value is None else pickle.loads(value) for value in values]
+
+	def set(self, key, value, ttl=None):
+		ttl = self.default_ttl if ttl is None else ttl
+		self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+	def delete(self, key):
+		self.client.delete(self.prefix + key)
+
+
+def init_cache(app):
+	cache_type = app.config.get('CACHE_TYPE', 'null')
+	ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+	if cache_type == 'redis':
+		backend = RedisCache.from_url(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+	elif cache_type == 'lru':
+		backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+	else:
+		backend = NullCache()
+	app.extensions['page_cache'] = backend
+	return backend
+
+
+def get_cache():
+	cache = current_app.extensions.get('page_cache')
+	return NullCache() if cache is None else cache
+
+
+def _tag_key(tag):
+	return 'tag:' + tag
+
+
+def _tag_versions(cache, tags):
+	versions = cache.get_many([_tag_key(tag) for tag in tags])
+	for i, version in enumerate(versions):
+		if version is None:
+			# Unknown or evicted tag: start a fresh version, which also
+			# orphans any page stored under a previous one.
+			versions[i] = uuid.uuid4().hex
+			cache.set(_tag_key(tags[i]), versions[i], ttl=0)
+	return versions
+
+
+def invalidate(*tags):
+	# Call after the write has been committed.
+	cache = get_cache()
+	for tag in tags:
+		cache.delete(_tag_key(tag))
+
+
+def _store_stream(cache, key, chunks, limit):
+	# Passes a streamed body through and caches it once complete.
+	parts = []
+	size = 0
+	for chunk in chunks:
+		if parts is not None:
+			size += len(chunk)
+			if size <= limit:
+				parts.append(chunk)
+			else:
+				parts = None
+		yield chunk
+	if parts is not None:
+		cache.set(key, ''.join(parts))
+
+
+def cached_page(*tags):
+	# Caches the rendered body of a GET view. Tags are format strings over
+	# the view arguments, e.g. cached_page('venue:{venue_id}').
+	def decorator(view):
+		@wraps(view)
+		def wrapper(**kwargs):
+			# Pages carrying flashed messages are specific to one visitor.
+			if request.method != 'GET' or session.get('_flashes'):
+				return view(**kwargs)
+
+			cache = get_cache()
+			page_tags = [tag.format(**kwargs) for tag in tags]
+			versions = _tag_versions(cache, page_tags)
+			# Under conditional_page the validator also keys the entry, so
+			# time-driven changes (a show becoming past) miss the cache.
+			versions.append(g.get('page_etag', ''))
+			key = 'page:' + request.full_path + ':' + ':'.join(versions)
+			body = cache.get_many([key])[0]
+			if body is None:
+				if not isinstance(cache, NullCache):
+					# The stored page is served to every visitor, writers
+					# pinned to the primary included: render it from the
+					# primary, so a lagging replica's pre-write page never
+					# lands under the tag versions of after the write.
+					g.db_replica = False
+				body = view(**kwargs)
+				if isinstance(body, str):
+					cache.set(key, body)
+				elif isinstance(body, Response) and body.is_streamed:
+					body.response = _store_stream(cache, key, body.response,
+						current_app.config.get('CACHE_MAX_STREAMED_CHARS', 1024 * 1024))
+			return body
+		return wrapper
+	return decorator
+
+
+def conditional_page(validator):
+	# Answers If-None-Match / If-Modified-Since with a 304 before the view
+	# runs; goes above cached_page. validator(**view_args) returns
+	# (version, last_modified) for the page, last_modified being a naive
+	# UTC datetime, or None to skip.
+	def decorator(view):
+		@wraps(view)
+		def wrapper(**kwargs):
+			if request.method != 'GET' or session.get('_flashes'):
+				return view(**kwargs)
+			validated = validator(**kwargs)
+			if validated is None:
+				return view(**kwargs)
+
+			version, last_modified = validated
+			last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+			digest = hashlib.sha1(repr((request.full_path, version)).encode()).hexdigest()
+			g.page_etag = digest
+
+			if request.if_none_match:
+				not_modified = request.if_none_match.contains(digest)
+			elif request.if_modified_since:
+				not_modified = last_modified <= request.if_modified_since
+			else:
+				not_modified = False
+
+			response = make_response('', 304) if not_modified else make_response(view(**kwargs))
+			response.set_etag(digest)
+			response.last_modified = last_modified
+			return response
+		return wrapper
+	return decorator
@@ -1,13 +1,21 @@
 import os
-from settings import DB_USER, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT, DB_DIALECT
+import uuid
+from sqlalchemy.pool import NullPool
+from settings import SECRET_KEY, DEBUG
+from settings import DB_USER, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT, DB_DIALECT, CACHE_TYPE, CACHE_REDIS_URL
+from settings import (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+	DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT, DB_PGBOUNCER, DB_REPLICA_URLS, DB_REPLICA_PIN_SECONDS,
+	DB_ASYNC_READS)
+from settings import LOG_LEVEL, SLOW_QUERY_MS
+from pool_metrics import TimedQueuePool
+
+# SECRET_KEY comes from the environment, never from the tracked .env.
+# Without it only debug mode (FLASK_DEBUG=1) serves pages, with a throwaway
+# key; CLI commands run either way. See app.create_app() and wsgi.py.
 
-SECRET_KEY = os.urandom(32)
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-# Enable debug mode.
-DEBUG = True
-
 # Connect to the database
 
 
@@ -15,3 +23,92 @@ DEBUG = True
 SQLALCHEMY_DATABASE_URI = f'{DB_DIALECT}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Each worker process holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW
+# connections: keep workers * that below the server's max_connections.
+if DB_PGBOUNCER:
+	# PgBouncer pools for every worker: hand connections straight back to
+	# it. It also refuses the 'options' startup parameter, so set the
+	# statement timeout on the role instead
+	# (ALTER ROLE ... SET statement_timeout = ...).
+	SQLALCHEMY_ENGINE_OPTIONS = {
+		'poolclass': NullPool,
+	}
+else:
+	SQLALCHEMY_ENGINE_OPTIONS = {
+		'poolclass': TimedQueuePool,
+		'pool_size': DB_POOL_SIZE,
+		'max_overflow': DB_MAX_OVERFLOW,
+		'pool_timeout': DB_POOL_TIMEOUT,
+		'pool_recycle': DB_POOL_RECYCLE,
+		'pool_pre_ping': DB_POOL_PRE_PING,
+	}
+	if DB_STATEMENT_TIMEOUT:
+		SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {
+			'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT}'
+		}
+
+# Async reads (async_queries.py): the venue and artist pages load through
+# SQLAlchemy's asyncio extension, asyncpg on Postgres. Its pool is separate
+# from the one above, with the same limits.
+ASYNC_READS = DB_ASYNC_READS
+if DB_PGBOUNCER:
+	# asyncpg prepares every statement: without a cache, and with unique
+	# names, they don't clash between the clients sharing a server
+	# connection.
+	ASYNC_ENGINE_OPTIONS = {
+		'poolclass': NullPool,
+		'connect_args': {
+			'statement_cache_size': 0,
+			'prepared_statement_name_func': lambda: f'__asyncpg_{uuid.uuid4()}__',
+		},
+	}
+else:
+	ASYNC_ENGINE_OPTIONS = {
+		'pool_size': DB_POOL_SIZE,
+		'max_overflow': DB_MAX_OVERFLOW,
+		'pool_timeout': DB_POOL_TIMEOUT,
+		'pool_recycle': DB_POOL_RECYCLE,
+		'pool_pre_ping': DB_POOL_PRE_PING,
+	}
+	if DB_STATEMENT_TIMEOUT:
+		ASYNC_ENGINE_OPTIONS['connect_args'] = {
+			'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT)}
+		}
+
+# Read replicas, one bind each; see routing.py. They share the engine
+# options above.
+SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(DB_REPLICA_URLS)}
+REPLICA_BINDS = tuple(SQLALCHEMY_BINDS)
+REPLICA_PIN_SECONDS = DB_REPLICA_PIN_SECONDS
+
+# Instrumentation: JSON logs on stderr, statements slower than
+# SLOW_QUERY_MS logged, per-route figures over the last ROUTE_STATS_WINDOW
+# requests, Server-Timing headers on every response.
+ROUTE_STATS_WINDOW = 1000
+SERVER_TIMING = True
+
+# /internal/* answers only these client addresses (behind a proxy, the
+# proxy's own address).
+INTERNAL_ALLOWED_ADDRS = ('127.0.0.1', '::1')
+
+# Shows listing page size (?per_page= can ask for up to MAX_SHOWS_PER_PAGE).
+SHOWS_PER_PAGE = 30
+MAX_SHOWS_PER_PAGE = 200
+
+# Page cache: CACHE_TYPE is 'redis' (CACHE_REDIS_URL, needs the redis
+# package), 'null' to disable, the default without CACHE_REDIS_URL, or 'lru'
+# (in-process). lru is for single-process servers only (tests, flask run):
+# a write only invalidates the writing worker's pages, the other workers
+# keep serving theirs until CACHE_DEFAULT_TTL runs out.
+CACHE_DEFAULT_TTL = 60
+CACHE_MAX_ENTRIES = 1024
+# Streamed pages longer than this (characters) are not cached.
+CACHE_MAX_STREAMED_CHARS = 1024 * 1024
+
+# Streamed pages are sent in chunks of about this many characters.
+STREAM_BUFFER_CHARS = 8192
+
+# Show scheduling: 'sql' asks the database, 'memory' keeps interval trees
+# in-process (tests, single process servers only).
+SCHEDULE_BACKEND = 'sql'
@@ -0,0 +1,160 @@
+#----------------------------------------------------------------------------#
+# Bulk export.
+#----------------------------------------------------------------------------#
+# Streams every venue, artist or show as CSV, JSON lines or Parquet, in the
+# field layout the bulk importer reads back.
+#
+# Rows are read in id-keyset batches. Each batch runs in its own short
+# read-only transaction over a server-side cursor (stream_results +
+# yield_per), so memory stays flat and no lock or snapshot is held for
+# the length of the export. Inside a GET request the batches come from a
+# read replica when there is one.
+
+import csv
+import io
+import json
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+
+BATCH_SIZE = 50000
+YIELD_PER = 1000
+
+# Per kind: model, exported columns as (field name, column), genre link.
+EXPORTS = {
+	'venues': (Venue, (
+		('id', Venue.id), ('name', Venue.name), ('city', Venue.city),
+		('state', Venue.state), ('address', Venue.address), ('phone', Venue.phone),
+		('image_link', Venue.image_link), ('facebook_link', Venue.facebook_link),
+		('website_link', Venue.website), ('seeking_talent', Venue.seeking_talent),
+		('seeking_description', Venue.seeking_description),
+	), venue_genres.c.venue_id),
+	'artists': (Artist, (
+		('id', Artist.id), ('name', Artist.name), ('city', Artist.city),
+		('state', Artist.state), ('phone', Artist.phone),
+		('image_link', Artist.image_link), ('facebook_link', Artist.facebook_link),
+		('website_link', Artist.website), ('seeking_venue', Artist.seeking_venue),
+		('seeking_description', Artist.seeking_description),
+	), artist_genres.c.artist_id),
+	'shows': (Show, (
+		('id', Show.id), ('venue_id', Show.venue_id), ('artist_id', Show.artist_id),
+		('start_time', Show.start_time), ('end_time', Show.end_time),
+	), None),
+}
+
+
+def export_fields(kind):
+	_, columns, link = EXPORTS[kind]
+	return [name for name, _ in columns] + (['genres'] if link is not None else [])
+
+
+def _genres_by_id(conn, link, ids):
+	genres = {}
+	rows = conn.execute(db.select(link, Genre.name).select_from(
+		link.table.join(Genre, Genre.id == link.table.c.genre_id)
+	).where(link.in_(ids)).order_by(Genre.name))
+	for e_id, name in rows:
+		genres.setdefault(e_id, []).append(name)
+	return genres
+
+
+def iter_records(kind, batch_size=BATCH_SIZE):
+	# Yields one dict per row, ordered by id.
+	model, columns, link = EXPORTS[kind]
+	names = [name for name, _ in columns]
+	last_id = 0
+	while True:
+		count = 0
+		with db.session.get_bind().connect() as conn:
+			result = conn.execution_options(stream_results=True).execute(
+				db.select(*[column for _, column in columns]).where(
+					model.id > last_id).order_by(model.id).limit(batch_size)
+			).yield_per(YIELD_PER)
+			for partition in result.partitions():
+				genres = _genres_by_id(conn, link, [row[0] for row in partition]) if link is not None else None
+				for row in partition:
+					record = dict(zip(names, row))
+					if genres is not None:
+						record['genres'] = genres.get(row[0], [])
+					yield record
+				count += len(partition)
+				last_id = partition[-1][0]
+		if count < batch_size:
+			return
+
+
+def _csv_value(value):
+	if isinstance(value, bool):
+		return 'y' if value else ''
+	if isinstance(value, list):
+		return ';'.join(value)
+	if hasattr(value, 'strftime'):
+		return value.strftime('%Y-%m-%d %H:%M:%S')
+	return '' if value is None else value
+
+
+def csv_chunks(kind, records):
+	# Yields CSV text, one chunk per YIELD_PER records.
+	buffer = io.StringIO()
+	writer = csv.DictWriter(buffer, fieldnames=export_fields(kind))
+	writer.writeheader()
+	for count, record in enumerate(records, 1):
+		writer.writerow({key: _csv_value(value) for key, value in record.items()})
+		if count % YIELD_PER == 0:
+			yield buffer.getvalue()
+			buffer.seek(0)
+			buffer.truncate()
+	yield buffer.getvalue()
+
+
+def _json_default(value):
+	return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def jsonl_chunks(kind, records):
+	lines = []
+	for record in records:
+		lines.append(json.dumps(record, default=_json_default))
+		if len(lines) == YIELD_PER:
+			yield '\n'.join(lines) + '\n'
+			lines = []
+	if lines:
+		yield '\n'.join(lines) + '\n'
+
+
+def _arrow_schema(kind):
+	# Declared rather than inferred from the rows: a column that is all
+	# None in one row group (seeking_description, genres) would otherwise
+	# be typed null and clash with the next one.
+	import pyarrow as pa
+
+	types = ((db.Boolean, pa.bool_()), (db.Integer, pa.int64()),
+		(db.DateTime, pa.timestamp('us')), (db.String, pa.string()))
+	_, columns, link = EXPORTS[kind]
+	fields = [pa.field(name, next(arrow for sql, arrow in types if isinstance(column.type, sql)))
+		for name, column in columns]
+	if link is not None:
+		fields.append(pa.field('genres', pa.list_(pa.string())))
+	return pa.schema(fields)
+
+
+def write_parquet(kind, records, path):
+	# One row group per YIELD_PER records. Needs the pyarrow package.
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+
+	schema = _arrow_schema(kind)
+	batch = []
+	with pq.ParquetWriter(path, schema) as writer:
+		for record in records:
+			batch.append(record)
+			if len(batch) == YIELD_PER:
+				writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+				batch = []
+		if batch:
+			writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+STREAM_FORMATS = {
+	'csv': (csv_chunks, 'text/csv'),
+	'jsonl': (jsonl_chunks, 'application/x-ndjson'),
+}
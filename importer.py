@@ -0,0 +1,343 @@
+#----------------------------------------------------------------------------#
+# Bulk import.
+#----------------------------------------------------------------------------#
+# Streams venues, artists or shows from CSV or JSON-lines into the
+# database, one bounded chunk at a time:
+#
+#   * rows are validated with the same forms as the HTML create pages,
+#   * duplicates are found with one set-based lookup per chunk, using the
+#     same rules as the create handlers,
+#   * valid rows are written with executemany, one transaction per chunk.
+#
+# Only the current chunk is held in memory. Row errors go to an on_error
+# callback as they happen; the report keeps counts and the first few.
+#
+# CSV genres are separated by ';'. JSON-lines genres may also be a list.
+
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from werkzeug.datastructures import MultiDict
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from forms import VenueForm, ArtistForm, ShowForm
+from cache import invalidate
+from search import reset_index
+from scheduling import Booking, MAX_DURATION, busy_trees, get_schedule
+from summaries import refresh as refresh_summaries
+from whats_on import sync as sync_calendar
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportReport:
+
+	def __init__(self, on_error=None):
+		self.rows = 0
+		self.inserted = 0
+		self.duplicates = 0
+		self.failed = 0
+		self.errors = []
+		self.on_error = on_error
+
+	def error(self, line, messages):
+		self.failed += 1
+		if len(self.errors) < MAX_REPORTED_ERRORS:
+			self.errors.append({"line": line, "errors": messages})
+		if self.on_error is not None:
+			self.on_error(line, messages)
+
+	def as_dict(self):
+		return {
+			"rows": self.rows,
+			"inserted": self.inserted,
+			"duplicates": self.duplicates,
+			"failed": self.failed,
+			"errors": self.errors
+		}
+
+
+#  Parsing
+#  ----------------------------------------------------------------
+
+def read_rows(stream, fmt):
+	# Yields (line number, row dict or None if unparsable) from a text stream.
+	if fmt == 'csv':
+		reader = csv.DictReader(stream)
+		for row in reader:
+			yield reader.line_num, row
+	elif fmt == 'jsonl':
+		for line_num, line in enumerate(stream, 1):
+			if not line.strip():
+				continue
+			try:
+				row = json.loads(line)
+			except ValueError:
+				row = None
+			yield line_num, row if isinstance(row, dict) else None
+	else:
+		raise ValueError(f'Unsupported format: {fmt}')
+
+
+def chunks(rows, size):
+	chunk = []
+	for row in rows:
+		chunk.append(row)
+		if len(chunk) == size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
+
+
+def form_data(row):
+	# Form input from a parsed row; genres become repeated keys.
+	items = []
+	for key, value in row.items():
+		if key == 'genres':
+			if isinstance(value, str):
+				value = [genre.strip() for genre in value.split(';') if genre.strip()]
+			items.extend(('genres', genre) for genre in value or [])
+		elif isinstance(value, bool):
+			if value:
+				items.append((key, 'y'))
+		elif value is not None:
+			items.append((key, str(value)))
+	return MultiDict(items)
+
+
+def validate(form_class, line, row, report):
+	if row is None:
+		report.error(line, {"row": ["Unparsable row"]})
+		return None
+	form = form_class(formdata=form_data(row), meta={'csrf': False})
+	if not form.validate():
+		report.error(line, form.errors)
+		return None
+	return form
+
+
+#  Entities
+#  ----------------------------------------------------------------
+
+def venue_values(form):
+	return {
+		"name": form.name.data,
+		"city": form.city.data,
+		"state": form.state.data,
+		"address": form.address.data,
+		"phone": form.phone.data,
+		"image_link": form.image_link.data,
+		"facebook_link": form.facebook_link.data,
+		"website": form.website_link.data,
+		"seeking_talent": bool(form.seeking_talent.data),
+		"seeking_description": form.seeking_description.data,
+	}
+
+
+def artist_values(form):
+	return {
+		"name": form.name.data,
+		"city": form.city.data,
+		"state": form.state.data,
+		"phone": form.phone.data,
+		"image_link": form.image_link.data,
+		"facebook_link": form.facebook_link.data,
+		"website": form.website_link.data,
+		"seeking_venue": bool(form.seeking_venue.data),
+		"seeking_description": form.seeking_description.data,
+	}
+
+
+# Per kind: form, column values, duplicate key columns (compared
+# case-insensitively, as in the create handlers), genre association.
+ENTITIES = {
+	'venues': (Venue, VenueForm, venue_values, ('name', 'city'), venue_genres.c.venue_id),
+	'artists': (Artist, ArtistForm, artist_values, ('name',), artist_genres.c.artist_id),
+}
+
+
+def entity_key(values, key_columns):
+	return tuple((values[column] or '').lower() for column in key_columns)
+
+
+def existing_keys(model, key_columns, keys):
+	# Keys among `keys` that are already stored, in one query.
+	columns = [db.func.lower(getattr(model, column)) for column in key_columns]
+	names = {key[0] for key in keys}
+	return {tuple(row) for row in db.session.query(*columns).filter(columns[0].in_(names))}
+
+
+def import_entity_chunk(kind, chunk, report):
+	# Returns the cache tags to invalidate once the chunk is committed.
+	model, form_class, to_values, key_columns, link = ENTITIES[kind]
+
+	pending = {}
+	for line, row in chunk:
+		form = validate(form_class, line, row, report)
+		if form is None:
+			continue
+		values = to_values(form)
+		key = entity_key(values, key_columns)
+		if key in pending:
+			report.duplicates += 1
+			continue
+		pending[key] = (values, form.genres.data)
+	if not pending:
+		return []
+
+	for key in existing_keys(model, key_columns, pending.keys()):
+		if pending.pop(key, None) is not None:
+			report.duplicates += 1
+	if not pending:
+		return []
+
+	now = datetime.utcnow()
+	db.session.execute(model.__table__.insert(),
+		[dict(values, updated_at=now) for values, _ in pending.values()])
+
+	# Ids of the rows just written, for the genre association.
+	columns = [db.func.lower(getattr(model, column)) for column in key_columns]
+	ids = {}
+	for row in db.session.query(model.id, *columns).filter(
+			columns[0].in_({key[0] for key in pending})):
+		ids.setdefault(tuple(row[1:]), row[0])
+
+	genres = {genre.name: genre for genre in Genre.resolve(
+		[name for _, names in pending.values() for name in names])}
+	db.session.add_all(genres.values())
+	db.session.flush()
+	links = [{link.name: ids[key], 'genre_id': genres[name].id}
+		for key, (_, names) in pending.items() for name in dict.fromkeys(names)]
+	if links:
+		db.session.execute(link.table.insert(), links)
+
+	report.inserted += len(pending)
+	return [kind]
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+def import_show_chunk(chunk, report):
+	# Returns the cache tags to invalidate once the chunk is committed.
+	pending = {}
+	for line, row in chunk:
+		form = validate(ShowForm, line, row, report)
+		if form is None:
+			continue
+		try:
+			values = {
+				"venue_id": int(form.venue_id.data),
+				"artist_id": int(form.artist_id.data),
+				"start_time": form.start_time.data,
+			}
+		except ValueError:
+			report.error(line, {"id": ["venue_id and artist_id must be integers"]})
+			continue
+		# Exports carry end_time; hand-written files may give a duration.
+		try:
+			values["end_time"] = (datetime.fromisoformat(row["end_time"]) if row.get("end_time")
+				else values["start_time"] + timedelta(minutes=form.duration.data or 120))
+		except (TypeError, ValueError):
+			report.error(line, {"end_time": ["Not a valid datetime value."]})
+			continue
+		if not values["start_time"] < values["end_time"] <= values["start_time"] + MAX_DURATION:
+			report.error(line, {"end_time": ["Must be after start_time, by at most a day"]})
+			continue
+		key = (values["venue_id"], values["start_time"])
+		if key in pending:
+			report.duplicates += 1
+			continue
+		pending[key] = (line, values)
+	if not pending:
+		return []
+
+	venue_ids = {values["venue_id"] for _, values in pending.values()}
+	artist_ids = {values["artist_id"] for _, values in pending.values()}
+	known_venues = {row[0] for row in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+	known_artists = {row[0] for row in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+	# Bookings around the chunk, in one query; accepted rows join them so
+	# overlaps within the chunk are caught too.
+	trees = busy_trees(venue_ids, artist_ids,
+		min(values["start_time"] for _, values in pending.values()),
+		max(values["end_time"] for _, values in pending.values()))
+
+	rows = []
+	now = datetime.utcnow()
+	for (venue_id, start_time), (line, values) in pending.items():
+		end_time = values["end_time"]
+		venue_clashes = trees[('venue', venue_id)].overlapping(start_time, end_time)
+		if any(clash.start_time == start_time for clash in venue_clashes):
+			report.duplicates += 1
+		elif venue_clashes:
+			report.error(line, {"start_time": ["Venue already booked at that time"]})
+		elif trees[('artist', values["artist_id"])].overlapping(start_time, end_time):
+			report.error(line, {"artist_id": ["Artist already booked at that time"]})
+		elif venue_id not in known_venues:
+			report.error(line, {"venue_id": ["Unknown venue"]})
+		elif values["artist_id"] not in known_artists:
+			report.error(line, {"artist_id": ["Unknown artist"]})
+		else:
+			booking = Booking(None, venue_id, values["artist_id"], start_time, end_time)
+			trees[('venue', venue_id)].add(start_time, end_time, booking)
+			trees[('artist', values["artist_id"])].add(start_time, end_time, booking)
+			rows.append(dict(values, updated_at=now))
+	if not rows:
+		return []
+	# A concurrent booking of one of these slots is skipped, not fatal.
+	insert = Show.insert_or_ignore()
+	db.session.execute(Show.__table__.insert() if insert is None else insert, rows)
+	refresh_summaries(Venue, {row["venue_id"] for row in rows})
+	refresh_summaries(Artist, {row["artist_id"] for row in rows})
+	sync_calendar('venue_id', {row["venue_id"] for row in rows})
+	report.inserted += len(rows)
+	return ['shows', 'venues', 'calendar'] + list(
+		{f'venue:{row["venue_id"]}' for row in rows} | {f'artist:{row["artist_id"]}' for row in rows})
+
+
+#  Driver
+#  ----------------------------------------------------------------
+
+def run_import(kind, stream, fmt, chunk_size=CHUNK_SIZE, on_error=None, on_progress=None):
+	# Imports every row of a text stream; returns the ImportReport.
+	if kind not in ('venues', 'artists', 'shows'):
+		raise ValueError(f'Unsupported kind: {kind}')
+	report = ImportReport(on_error)
+
+	for chunk in chunks(read_rows(stream, fmt), chunk_size):
+		report.rows += len(chunk)
+		counts = report.inserted, report.duplicates, report.failed
+		try:
+			if kind == 'shows':
+				tags = import_show_chunk(chunk, report)
+			else:
+				tags = import_entity_chunk(kind, chunk, report)
+			db.session.commit()
+		except Exception as e:
+			db.session.rollback()
+			# The whole chunk is rolled back: report every row of it once.
+			report.inserted, report.duplicates, report.failed = counts
+			for line, _ in chunk:
+				report.error(line, {"chunk": [f'Not imported: {e}']})
+		else:
+			if tags:
+				invalidate(*tags)
+				if kind == 'shows':
+					get_schedule().reset()
+				else:
+					reset_index(ENTITIES[kind][0])
+		finally:
+			# Keep the identity map from growing with the file.
+			db.session.expunge_all()
+		if on_progress is not None:
+			on_progress(report)
+
+	return report
+
+
+def open_text(binary_stream):
+	return io.TextIOWrapper(binary_stream, encoding='utf-8', newline='')
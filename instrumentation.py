@@ -0,0 +1,242 @@
+#----------------------------------------------------------------------------#
+# Instrumentation.
+#----------------------------------------------------------------------------#
+# Times every SQL statement through the engine events and, per request:
+#
+#   * counts statements and database time, and keeps the slowest ones,
+#   * sends them back in a Server-Timing header (SERVER_TIMING),
+#   * adds them to a rolling window per route, summarised by
+#     /internal/metrics/routes.
+#
+# Statements slower than SLOW_QUERY_MS go to the 'fyyur.sql' logger. Logs
+# are written to stderr as one JSON object per line.
+#
+# Streamed responses (streaming.py) do most of their work after the
+# headers, when their queries have not run yet: their Server-Timing only
+# carries app, the time to the first byte, and no db metric; the route
+# figures cover them up to the last byte.
+
+import heapq
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+sql_logger = logging.getLogger('fyyur.sql')
+
+SLOWEST_PER_REQUEST = 3
+SLOWEST_PER_ROUTE = 5
+STATEMENT_MAX_LENGTH = 1000
+# Upper bounds in milliseconds of the request duration histogram.
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+
+#  Logging
+#  ----------------------------------------------------------------
+
+class JsonFormatter(logging.Formatter):
+	# One JSON object per record; pass fields with extra={'fields': {...}}.
+
+	def format(self, record):
+		data = {
+			"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+			"level": record.levelname,
+			"logger": record.name,
+			"message": record.getMessage(),
+		}
+		data.update(getattr(record, 'fields', {}))
+		if has_request_context():
+			data.setdefault("method", request.method)
+			data.setdefault("path", request.path)
+		if record.exc_info:
+			data["exception"] = self.formatException(record.exc_info)
+		return json.dumps(data, default=str)
+
+
+def configure_logging(app):
+	handler = logging.StreamHandler(sys.stderr)
+	handler.setFormatter(JsonFormatter())
+	level = app.config.get('LOG_LEVEL', 'INFO')
+	for logger in (app.logger, sql_logger):
+		logger.handlers[:] = [handler]
+		logger.setLevel(level)
+		logger.propagate = False
+
+
+#  Statements
+#  ----------------------------------------------------------------
+
+class QueryStats:
+	# Statements of one request.
+
+	def __init__(self):
+		self.count = 0
+		self.seconds = 0.0
+		self.slowest = []
+
+	def add(self, seconds, statement):
+		self.count += 1
+		self.seconds += seconds
+		entry = (seconds, statement[:STATEMENT_MAX_LENGTH])
+		if len(self.slowest) < SLOWEST_PER_REQUEST:
+			heapq.heappush(self.slowest, entry)
+		elif entry > self.slowest[0]:
+			heapq.heapreplace(self.slowest, entry)
+
+
+def route_name():
+	rule = request.url_rule
+	return f'{request.method} {rule.rule if rule is not None else "<unmatched>"}'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+	conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+	_record(conn, statement, executemany)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _stop_timer_on_error(context):
+	if context.connection is not None and context.statement is not None:
+		_record(context.connection, context.statement, False, failed=True)
+
+
+def _record(conn, statement, executemany, failed=False):
+	started = conn.info.get('query_started')
+	if not started:
+		return
+	seconds = time.perf_counter() - started.pop()
+
+	in_request = has_request_context()
+	if in_request:
+		stats = g.get('query_stats')
+		if stats is not None:
+			stats.add(seconds, statement)
+
+	threshold = current_app.config.get('SLOW_QUERY_MS') if has_app_context() else None
+	if threshold is not None and seconds * 1000 >= threshold:
+		sql_logger.warning('slow query', extra={'fields': {
+			"duration_ms": round(seconds * 1000, 3),
+			"statement": statement[:STATEMENT_MAX_LENGTH],
+			"executemany": executemany,
+			"failed": failed,
+			"route": route_name() if in_request else None,
+		}})
+
+
+#  Routes
+#  ----------------------------------------------------------------
+
+def _percentile(ordered, fraction):
+	if not ordered:
+		return 0.0
+	return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+
+class RouteStats:
+	# The last `window` requests of every route, thread-safe.
+
+	def __init__(self, window=1000):
+		self.window = window
+		self._samples = {}
+		self._slowest = {}
+		self._lock = threading.Lock()
+
+	def add(self, route, duration_ms, db_ms, queries, slowest):
+		with self._lock:
+			samples = self._samples.get(route)
+			if samples is None:
+				samples = self._samples[route] = deque(maxlen=self.window)
+				self._slowest[route] = {}
+			samples.append((duration_ms, db_ms, queries))
+			# Worst time per statement, for the few slowest statements.
+			top = self._slowest[route]
+			for seconds, statement in slowest:
+				top[statement] = max(top.get(statement, 0.0), seconds * 1000)
+			if len(top) > SLOWEST_PER_ROUTE:
+				for statement, _ in sorted(top.items(), key=lambda item: item[1])[:-SLOWEST_PER_ROUTE]:
+					del top[statement]
+
+	def summary(self):
+		with self._lock:
+			routes = {route: (list(samples), dict(self._slowest[route]))
+				for route, samples in self._samples.items()}
+
+		data = {}
+		for route, (samples, slowest) in routes.items():
+			durations = sorted(sample[0] for sample in samples)
+			db_times = sorted(sample[1] for sample in samples)
+			queries = [sample[2] for sample in samples]
+			histogram = {}
+			for bound in HISTOGRAM_BUCKETS:
+				label = f'<={bound:g}ms' if bound != float('inf') else '+Inf'
+				histogram[label] = sum(1 for duration in durations if duration <= bound)
+			data[route] = {
+				"requests": len(samples),
+				"duration_ms": {
+					"p50": _percentile(durations, 0.5),
+					"p95": _percentile(durations, 0.95),
+					"p99": _percentile(durations, 0.99),
+					"max": round(durations[-1], 3),
+				},
+				"db_ms": {
+					"p50": _percentile(db_times, 0.5),
+					"p95": _percentile(db_times, 0.95),
+					"p99": _percentile(db_times, 0.99),
+				},
+				"queries": {
+					"mean": sum(queries) / len(queries),
+					"max": max(queries),
+				},
+				# Cumulative, like Prometheus buckets.
+				"histogram": histogram,
+				"slowest_statements": [{"duration_ms": round(ms, 3), "statement": statement}
+					for statement, ms in sorted(slowest.items(), key=lambda item: -item[1])],
+			}
+		return data
+
+
+def init_instrumentation(app):
+	configure_logging(app)
+	route_stats = RouteStats(app.config.get('ROUTE_STATS_WINDOW', 1000))
+	app.extensions['route_stats'] = route_stats
+
+	@app.before_request
+	def start_request():
+		g.request_started = time.perf_counter()
+		g.query_stats = QueryStats()
+
+	@app.after_request
+	def finish_request(response):
+		stats = g.get('query_stats')
+		if stats is None:
+			return response
+		started = g.request_started
+		route = route_name()
+		duration_ms = (time.perf_counter() - started) * 1000
+		db_ms = stats.seconds * 1000
+		if response.is_streamed:
+			response.call_on_close(lambda: route_stats.add(route,
+				(time.perf_counter() - started) * 1000, stats.seconds * 1000,
+				stats.count, stats.slowest))
+		else:
+			route_stats.add(route, duration_ms, db_ms, stats.count, stats.slowest)
+		if app.config.get('SERVER_TIMING', True):
+			timing = f'app;dur={duration_ms:.1f}'
+			if not response.is_streamed:
+				timing = f'db;dur={db_ms:.1f};desc="{stats.count} queries", {timing}'
+			response.headers.add('Server-Timing', timing)
+		return response
+
+	return route_stats
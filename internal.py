@@ -0,0 +1,52 @@
+#----------------------------------------------------------------------------#
+# Internal endpoints.
+#----------------------------------------------------------------------------#
+# Operational views for monitoring, answered only to the addresses in
+# INTERNAL_ALLOWED_ADDRS; anybody else gets a 404.
+#
+#   /internal/metrics/pool     pool metrics of the answering worker, JSON,
+#                              or Prometheus text with ?format=prometheus
+#   /internal/metrics/routes   per-route timings and query counts of the
+#                              answering worker's recent requests
+
+from functools import wraps
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from pool_metrics import prometheus_text
+
+internal = Blueprint('internal', __name__, url_prefix='/internal')
+
+
+@internal.before_request
+def local_only():
+	if request.remote_addr not in current_app.config.get('INTERNAL_ALLOWED_ADDRS', ()):
+		abort(404)
+
+
+def internal_only(view):
+	# The same restriction for views outside /internal (bulk.py).
+	@wraps(view)
+	def guarded(*args, **kwargs):
+		local_only()
+		return view(*args, **kwargs)
+	return guarded
+
+
+@internal.route('/metrics/pool')
+def pool_metrics():
+	metrics = current_app.extensions.get('pool_metrics')
+	if metrics is None:
+		abort(404)
+	data = metrics.snapshot()
+	if request.args.get('format') == 'prometheus':
+		return Response(prometheus_text('fyyur_db_pool', data), mimetype='text/plain; version=0.0.4')
+	return jsonify(data)
+
+
+@internal.route('/metrics/routes')
+def route_metrics():
+	route_stats = current_app.extensions.get('route_stats')
+	if route_stats is None:
+		abort(404)
+	return jsonify(route_stats.summary())
@@ -0,0 +1,49 @@
+"""show end_time and overlap exclusion
+
+Revision ID: 0a7d4e2c9f51
+Revises: f3c8a61d2b94
+Create Date: 2026-10-18 15:48:12.730265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7d4e2c9f51'
+down_revision = 'f3c8a61d2b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # btree_gist lets the exclusion constraints mix = on ids with && on ranges.
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # Existing shows get the default two hours, cut short by the next show of
+    # the same venue or artist so the constraints below hold.
+    op.execute(
+        "UPDATE show SET end_time = LEAST(show.start_time + interval '2 hours',"
+        " next.venue_next, next.artist_next)"
+        " FROM (SELECT id,"
+        "   lead(start_time) OVER (PARTITION BY venue_id ORDER BY start_time) AS venue_next,"
+        "   lead(start_time) OVER (PARTITION BY artist_id ORDER BY start_time) AS artist_next"
+        "   FROM show) AS next"
+        " WHERE next.id = show.id"
+    )
+    op.alter_column('show', 'end_time', nullable=False)
+    op.create_check_constraint('ck_show_end_after_start', 'show', 'end_time > start_time')
+    # start_time is naive local time, hence tsrange rather than tstzrange.
+    for column in ('venue_id', 'artist_id'):
+        name = 'ex_show_{}_overlap'.format(column[:-3])
+        op.execute(
+            f'ALTER TABLE show ADD CONSTRAINT {name}'
+            f' EXCLUDE USING gist ({column} WITH =, tsrange(start_time, end_time) WITH &&)'
+        )
+
+
+def downgrade():
+    op.drop_constraint('ex_show_artist_overlap', 'show')
+    op.drop_constraint('ex_show_venue_overlap', 'show')
+    op.drop_constraint('ck_show_end_after_start', 'show')
+    op.drop_column('show', 'end_time')
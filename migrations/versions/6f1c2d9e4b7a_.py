@@ -0,0 +1,40 @@
+"""trigram search indexes
+
+Revision ID: 6f1c2d9e4b7a
+Revises: 939e6ba896dd
+Create Date: 2026-10-18 09:12:40.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1c2d9e4b7a'
+down_revision = '939e6ba896dd'
+branch_labels = None
+depends_on = None
+
+# The expressions must match the ones built in search.py, otherwise the
+# planner will not use the indexes.
+INDEXES = (
+    ('ix_venue_name_trgm', 'Venue', 'name'),
+    ('ix_venue_location_trgm', 'Venue', "(city || ', ' || state)"),
+    ('ix_venue_genres_trgm', 'Venue', '(CAST(genres AS TEXT))'),
+    ('ix_artist_name_trgm', 'Artist', 'name'),
+    ('ix_artist_location_trgm', 'Artist', "(city || ', ' || state)"),
+    ('ix_artist_genres_trgm', 'Artist', '(CAST(genres AS TEXT))'),
+)
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, expression in INDEXES:
+        op.execute(
+            f'CREATE INDEX {name} ON "{table}" USING gin ({expression} gin_trgm_ops)'
+        )
+
+
+def downgrade():
+    for name, _, _ in INDEXES:
+        op.execute(f'DROP INDEX {name}')
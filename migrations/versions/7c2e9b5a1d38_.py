@@ -0,0 +1,43 @@
+"""show summaries on venues and artists
+
+Revision ID: 7c2e9b5a1d38
+Revises: 0a7d4e2c9f51
+Create Date: 2026-10-18 17:05:44.318920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9b5a1d38'
+down_revision = '0a7d4e2c9f51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, column in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False,
+            server_default='0'))
+        op.add_column(table, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('last_show_time', sa.DateTime(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_next_show_time'), table, ['next_show_time'], unique=False)
+        # Same values as summaries.refresh(); start times are naive local time.
+        op.execute(
+            f'UPDATE "{table}" SET'
+            f' upcoming_shows_count = (SELECT count(*) FROM show'
+            f'   WHERE show.{column} = "{table}".id AND show.start_time >= localtimestamp),'
+            f' next_show_time = (SELECT min(start_time) FROM show'
+            f'   WHERE show.{column} = "{table}".id AND show.start_time >= localtimestamp),'
+            f' last_show_time = (SELECT max(start_time) FROM show'
+            f'   WHERE show.{column} = "{table}".id AND show.start_time < localtimestamp)'
+        )
+
+
+def downgrade():
+    for table in ('Artist', 'Venue'):
+        op.drop_index(op.f(f'ix_{table}_next_show_time'), table_name=table)
+        op.drop_column(table, 'last_show_time')
+        op.drop_column(table, 'next_show_time')
+        op.drop_column(table, 'upcoming_shows_count')
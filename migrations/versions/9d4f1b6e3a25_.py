@@ -0,0 +1,55 @@
+"""calendar entries
+
+Revision ID: 9d4f1b6e3a25
+Revises: 7c2e9b5a1d38
+Create Date: 2026-10-18 18:12:09.604713
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4f1b6e3a25'
+down_revision = '7c2e9b5a1d38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('calendar_entry',
+    sa.Column('show_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('city_key', sa.String(length=120), nullable=False),
+    sa.Column('city', sa.String(length=120), nullable=True),
+    sa.Column('state', sa.String(length=120), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('artist_name', sa.String(), nullable=True),
+    sa.Column('artist_image_link', sa.String(length=500), nullable=True),
+    sa.ForeignKeyConstraint(['show_id'], ['show.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('show_id')
+    )
+    op.create_index('ix_calendar_entry_city_key_day', 'calendar_entry', ['city_key', 'day', 'start_time'], unique=False)
+    op.create_index('ix_calendar_entry_day', 'calendar_entry', ['day', 'start_time'], unique=False)
+    op.create_index(op.f('ix_calendar_entry_venue_id'), 'calendar_entry', ['venue_id'], unique=False)
+    op.create_index(op.f('ix_calendar_entry_artist_id'), 'calendar_entry', ['artist_id'], unique=False)
+    # Same rows as whats_on.refresh().
+    op.execute(
+        'INSERT INTO calendar_entry (show_id, day, city_key, city, state, start_time,'
+        ' venue_id, venue_name, artist_id, artist_name, artist_image_link)'
+        ' SELECT show.id, date(show.start_time), coalesce(lower("Venue".city), \'\'), "Venue".city, "Venue".state,'
+        ' show.start_time, "Venue".id, "Venue".name, "Artist".id, "Artist".name, "Artist".image_link'
+        ' FROM show JOIN "Venue" ON "Venue".id = show.venue_id JOIN "Artist" ON "Artist".id = show.artist_id'
+        ' WHERE show.start_time >= current_date'
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_calendar_entry_artist_id'), table_name='calendar_entry')
+    op.drop_index(op.f('ix_calendar_entry_venue_id'), table_name='calendar_entry')
+    op.drop_index('ix_calendar_entry_day', table_name='calendar_entry')
+    op.drop_index('ix_calendar_entry_city_key_day', table_name='calendar_entry')
+    op.drop_table('calendar_entry')
@@ -0,0 +1,84 @@
+"""normalized genres
+
+Revision ID: d82a5c1f6e09
+Revises: b41e7f0a9c3d
+Create Date: 2026-10-18 11:27:53.906114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd82a5c1f6e09'
+down_revision = 'b41e7f0a9c3d'
+branch_labels = None
+depends_on = None
+
+# (association table, entity table, entity key column)
+LINKS = (
+    ('venue_genres', 'Venue', 'venue_id'),
+    ('artist_genres', 'Artist', 'artist_id'),
+)
+
+
+def upgrade():
+    op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for link, table, key in LINKS:
+        op.create_table(link,
+        sa.Column(key, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([key], [f'{table}.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+        sa.PrimaryKeyConstraint(key, 'genre_id')
+        )
+        op.create_index(f'ix_{link}_genre_id_{key}', link, ['genre_id', key], unique=False)
+
+    # The genres columns hold the text form of a Postgres array
+    # ('{Jazz,"Rock n Roll"}'); casting back to text[] parses the quoting.
+    op.execute("""
+        INSERT INTO genre (name)
+        SELECT DISTINCT unnest(genres::text[]) FROM "Venue"
+        UNION
+        SELECT DISTINCT unnest(genres::text[]) FROM "Artist"
+    """)
+    for link, table, key in LINKS:
+        op.execute(f"""
+            INSERT INTO {link} ({key}, genre_id)
+            SELECT DISTINCT e.id, g.id
+            FROM "{table}" e
+            CROSS JOIN LATERAL unnest(e.genres::text[]) AS n(name)
+            JOIN genre g ON g.name = n.name
+        """)
+
+    op.execute('DROP INDEX ix_venue_genres_trgm')
+    op.execute('DROP INDEX ix_artist_genres_trgm')
+    op.drop_column('Venue', 'genres')
+    op.drop_column('Artist', 'genres')
+    op.execute('CREATE INDEX ix_genre_name_trgm ON genre USING gin (name gin_trgm_ops)')
+
+
+def downgrade():
+    op.execute('DROP INDEX ix_genre_name_trgm')
+    op.add_column('Artist', sa.Column('genres', sa.VARCHAR(length=120), nullable=True))
+    op.add_column('Venue', sa.Column('genres', sa.VARCHAR(length=120), nullable=True))
+    for link, table, key in LINKS:
+        op.execute(f"""
+            UPDATE "{table}" e SET genres = coalesce((
+                SELECT array_agg(g.name ORDER BY g.name)::text
+                FROM {link} l JOIN genre g ON g.id = l.genre_id
+                WHERE l.{key} = e.id
+            ), '{{}}')
+        """)
+        op.alter_column(table, 'genres', existing_type=sa.VARCHAR(length=120), nullable=False)
+    op.execute('CREATE INDEX ix_venue_genres_trgm ON "Venue" USING gin ((CAST(genres AS TEXT)) gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_artist_genres_trgm ON "Artist" USING gin ((CAST(genres AS TEXT)) gin_trgm_ops)')
+    for link, _, key in LINKS:
+        op.drop_index(f'ix_{link}_genre_id_{key}', table_name=link)
+        op.drop_table(link)
+    op.drop_table('genre')
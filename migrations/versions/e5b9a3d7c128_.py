@@ -0,0 +1,29 @@
+"""updated_at columns
+
+Revision ID: e5b9a3d7c128
+Revises: d82a5c1f6e09
+Create Date: 2026-10-18 12:40:05.571842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9a3d7c128'
+down_revision = 'd82a5c1f6e09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The server default backfills existing rows; the app sets the value
+    # on every insert and update.
+    for table in ('Venue', 'Artist', 'show'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=False,
+            server_default=sa.text("timezone('utc', now())")))
+
+
+def downgrade():
+    for table in ('show', 'Artist', 'Venue'):
+        op.drop_column(table, 'updated_at')
@@ -0,0 +1,52 @@
+"""unique show slots
+
+Revision ID: f3c8a61d2b94
+Revises: e5b9a3d7c128
+Create Date: 2026-10-18 14:21:36.209417
+
+"""
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a61d2b94'
+down_revision = 'e5b9a3d7c128'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Double bookings made before the constraint existed would block it.
+    # Which show of a slot to keep is the operator's call: list them and
+    # stop, leaving the data as it was, rather than delete any.
+    bind = op.get_bind()
+    clashes = []
+    for column in ('venue_id', 'artist_id'):
+        rows = bind.execute(sa.text(
+            f'SELECT {column}, start_time, id FROM show'
+            f' WHERE ({column}, start_time) IN (SELECT {column}, start_time FROM show'
+            f'  GROUP BY {column}, start_time HAVING count(*) > 1)'
+            f' ORDER BY {column}, start_time, id'
+        )).fetchall()
+        for (entity_id, start_time), slot in groupby(rows, key=lambda row: row[:2]):
+            show_ids = ', '.join(str(row[2]) for row in slot)
+            clashes.append(f'  {column} {entity_id} at {start_time}: shows {show_ids}')
+    if clashes:
+        raise RuntimeError(
+            'Double-booked shows block the unique show slots; move or delete'
+            ' all but one show of each slot, then upgrade again:\n' + '\n'.join(clashes))
+
+    for column in ('venue_id', 'artist_id'):
+        index = f'ix_show_{column}_start_time'
+        op.drop_index(index, table_name='show')
+        op.create_index(index, 'show', [column, 'start_time'], unique=True)
+
+
+def downgrade():
+    for column in ('artist_id', 'venue_id'):
+        index = f'ix_show_{column}_start_time'
+        op.drop_index(index, table_name='show')
+        op.create_index(index, 'show', [column, 'start_time'], unique=False)
@@ -1,7 +1,44 @@
-from flask_sqlalchemy import SQLAlchemy
+from datetime import datetime, timedelta
 
-db = SQLAlchemy()
+from sqlalchemy.exc import IntegrityError
 
+from routing import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+
+
+# Genres are shared rows linked through association tables, so "venues or
+# artists by genre" is an index lookup on (genre_id, ...).
+venue_genres = db.Table('venue_genres',
+	db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+	db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+	db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table('artist_genres',
+	db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+	db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True),
+	db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+class Genre(db.Model):
+	__tablename__ = 'genre'
+	id = db.Column(db.Integer, primary_key=True)
+	name = db.Column(db.String(120), nullable=False, unique=True)
+
+	@classmethod
+	def resolve(cls, names):
+		# Genre rows for the given names, creating the missing ones, with a
+		# single lookup query.
+		names = list(dict.fromkeys(names))
+		found = {g.name: g for g in cls.query.filter(cls.name.in_(names))} if names else {}
+		return [found.get(name) or cls(name=name) for name in names]
+
+
+DEFAULT_SHOW_DURATION = timedelta(hours=2)
+
+def default_end_time(context):
+	return context.get_current_parameters()['start_time'] + DEFAULT_SHOW_DURATION
 
 class Show(db.Model):
 	__tablename__='show'
@@ -9,6 +46,49 @@ class Show(db.Model):
 	venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
 	artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
 	start_time = db.Column(db.DateTime, nullable=False)
+	end_time = db.Column(db.DateTime, nullable=False, default=default_end_time)
+	updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+	# Every timeline and count filters on one side of the show plus a
+	# start_time range; the listing seeks on (start_time, id). The first two
+	# are unique so a venue or an artist can't be booked twice at the same
+	# time, whatever the number of concurrent submissions. On Postgres the
+	# migrations also add GiST exclusion constraints (ex_show_venue_overlap,
+	# ex_show_artist_overlap) rejecting overlapping [start_time, end_time).
+	__table_args__ = (
+		db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time', unique=True),
+		db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time', unique=True),
+		db.Index('ix_show_start_time_id', 'start_time', 'id'),
+		db.CheckConstraint('end_time > start_time', name='ck_show_end_after_start'),
+	)
+
+	@classmethod
+	def insert_or_ignore(cls):
+		# INSERT ... ON CONFLICT DO NOTHING on the dialects that have it,
+		# None elsewhere.
+		dialect = db.session.get_bind().dialect.name
+		if dialect == 'postgresql':
+			from sqlalchemy.dialects.postgresql import insert
+		elif dialect == 'sqlite':
+			from sqlalchemy.dialects.sqlite import insert
+		else:
+			return None
+		return insert(cls.__table__).on_conflict_do_nothing()
+
+	@classmethod
+	def book(cls, venue_id, artist_id, start_time, end_time):
+		# Inserts the show in one statement, without a lookup first. Returns
+		# the new id, or None when a constraint rejects the slot.
+		values = dict(venue_id=venue_id, artist_id=artist_id, start_time=start_time,
+			end_time=end_time, updated_at=datetime.utcnow())
+		stmt = cls.insert_or_ignore()
+		if stmt is not None:
+			return db.session.execute(stmt.values(**values).returning(cls.id)).scalar()
+		try:
+			with db.session.begin_nested():
+				return db.session.execute(cls.__table__.insert().values(**values)).inserted_primary_key[0]
+		except IntegrityError:
+			return None
 
 class Venue(db.Model):
 	__tablename__ = 'Venue'
@@ -25,9 +105,17 @@ class Venue(db.Model):
 	website = db.Column(db.String(500))
 	seeking_talent = db.Column(db.Boolean, nullable=False)
 	seeking_description = db.Column(db.String())
-	#genres = db.Column(db.String(120))
-	genres = db.Column(db.ARRAY(db.String()), nullable=False)
+	genres = db.relationship('Genre', secondary=venue_genres, order_by='Genre.name', lazy=True)
+	updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 	shows = db.relationship('Show', backref='Venue', lazy=True)
+	# Show summary, maintained by summaries.py.
+	upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+	next_show_time = db.Column(db.DateTime, index=True)
+	last_show_time = db.Column(db.DateTime)
+
+	@property
+	def genre_names(self):
+		return [genre.name for genre in self.genres]
 
 class Artist(db.Model):
 	__tablename__ = 'Artist'
@@ -37,12 +125,42 @@ class Artist(db.Model):
 	city = db.Column(db.String(120))
 	state = db.Column(db.String(120))
 	phone = db.Column(db.String(120))
-	#genres = db.Column(db.String(120))
-	genres = db.Column(db.ARRAY(db.String()), nullable=False)
+	genres = db.relationship('Genre', secondary=artist_genres, order_by='Genre.name', lazy=True)
 	image_link = db.Column(db.String(500))
 	facebook_link = db.Column(db.String(120))
 	# TODO: implement any missing fields, as a database migration using Flask-Migrate
 	website = db.Column(db.String(500))
 	seeking_venue = db.Column(db.Boolean, nullable=False)
 	seeking_description = db.Column(db.String())
-	shows = db.relationship('Show', backref='Artist', lazy=True)
\ No newline at end of file
+	updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+	shows = db.relationship('Show', backref='Artist', lazy=True)
+	# Show summary, maintained by summaries.py.
+	upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+	next_show_time = db.Column(db.DateTime, index=True)
+	last_show_time = db.Column(db.DateTime)
+
+	@property
+	def genre_names(self):
+		return [genre.name for genre in self.genres]
+
+
+class CalendarEntry(db.Model):
+	# The "what's on" calendar: one row per upcoming show with what the
+	# page displays, keyed by (city, day). Rebuilt by whats_on.py.
+	__tablename__ = 'calendar_entry'
+	show_id = db.Column(db.Integer, db.ForeignKey('show.id', ondelete='CASCADE'), primary_key=True)
+	day = db.Column(db.Date, nullable=False)
+	city_key = db.Column(db.String(120), nullable=False)
+	city = db.Column(db.String(120))
+	state = db.Column(db.String(120))
+	start_time = db.Column(db.DateTime, nullable=False)
+	venue_id = db.Column(db.Integer, nullable=False, index=True)
+	venue_name = db.Column(db.String)
+	artist_id = db.Column(db.Integer, nullable=False, index=True)
+	artist_name = db.Column(db.String)
+	artist_image_link = db.Column(db.String(500))
+
+	__table_args__ = (
+		db.Index('ix_calendar_entry_city_key_day', 'city_key', 'day', 'start_time'),
+		db.Index('ix_calendar_entry_day', 'day', 'start_time'),
+	)
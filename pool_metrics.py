@@ -0,0 +1,156 @@
+#----------------------------------------------------------------------------#
+# Connection pool metrics.
+#----------------------------------------------------------------------------#
+# Counters fed by the engine's pool events, plus checkout latency measured
+# by TimedQueuePool, the pool class config.py selects. Every worker process
+# has its own pool, so every snapshot carries the worker's pid.
+
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class WaitStats:
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.timeouts = 0
+		self._lock = threading.Lock()
+
+	def record(self, seconds, timed_out=False):
+		with self._lock:
+			self.count += 1
+			self.total += seconds
+			self.max = max(self.max, seconds)
+			if timed_out:
+				self.timeouts += 1
+
+
+class TimedQueuePool(QueuePool):
+	# QueuePool timing each checkout: the wait for a free connection, or
+	# for a new one to open when the pool may still grow.
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.wait_stats = WaitStats()
+
+	def _do_get(self):
+		start = time.perf_counter()
+		timed_out = False
+		try:
+			return super()._do_get()
+		except PoolTimeoutError:
+			timed_out = True
+			raise
+		finally:
+			self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+	def recreate(self):
+		# Keep the figures across dispose() and reconnects.
+		pool = super().recreate()
+		pool.wait_stats = self.wait_stats
+		return pool
+
+
+class PoolMetrics:
+
+	def __init__(self, engine, clock=time.monotonic):
+		self.engine = engine
+		self.clock = clock
+		self.checkouts = 0
+		self.checkins = 0
+		self.opened = 0
+		self.closed = 0
+		self.invalidated = 0
+		self._opened_at = {}
+		self._lock = threading.Lock()
+		event.listen(engine, 'connect', self._on_connect)
+		event.listen(engine, 'checkout', self._on_checkout)
+		event.listen(engine, 'checkin', self._on_checkin)
+		event.listen(engine, 'close', self._on_close)
+		event.listen(engine, 'close_detached', self._on_close_detached)
+		event.listen(engine, 'invalidate', self._on_invalidate)
+
+	def _on_connect(self, dbapi_connection, record):
+		with self._lock:
+			self.opened += 1
+			self._opened_at[id(dbapi_connection)] = self.clock()
+
+	def _on_checkout(self, dbapi_connection, record, proxy):
+		with self._lock:
+			self.checkouts += 1
+
+	def _on_checkin(self, dbapi_connection, record):
+		with self._lock:
+			self.checkins += 1
+
+	def _on_close(self, dbapi_connection, record):
+		self._on_close_detached(dbapi_connection)
+
+	def _on_close_detached(self, dbapi_connection):
+		with self._lock:
+			if self._opened_at.pop(id(dbapi_connection), None) is not None:
+				self.closed += 1
+
+	def _on_invalidate(self, dbapi_connection, record, exception):
+		with self._lock:
+			self.invalidated += 1
+
+	def snapshot(self):
+		pool = self.engine.pool
+		now = self.clock()
+		with self._lock:
+			ages = [now - opened_at for opened_at in self._opened_at.values()]
+			data = {
+				"pid": os.getpid(),
+				"pool_class": type(pool).__name__,
+				"checkouts_total": self.checkouts,
+				"checkins_total": self.checkins,
+				"connections_opened_total": self.opened,
+				"connections_closed_total": self.closed,
+				"invalidations_total": self.invalidated,
+				"open_connections": len(ages),
+				"connection_age_max_seconds": max(ages, default=0.0),
+				"connection_age_avg_seconds": sum(ages) / len(ages) if ages else 0.0,
+			}
+		# Only QueuePool and its subclasses keep a size and an overflow.
+		if isinstance(pool, QueuePool):
+			data.update({
+				"pool_size": pool.size(),
+				"checked_in": pool.checkedin(),
+				"checked_out": pool.checkedout(),
+				"overflow": pool.overflow(),
+			})
+		wait_stats = getattr(pool, 'wait_stats', None)
+		if wait_stats is not None:
+			data.update({
+				"checkout_waits_total": wait_stats.count,
+				"checkout_wait_seconds_total": wait_stats.total,
+				"checkout_wait_seconds_max": wait_stats.max,
+				"checkout_timeouts_total": wait_stats.timeouts,
+			})
+		return data
+
+
+def prometheus_text(prefix, data):
+	# Prometheus text exposition of a flat snapshot, labelled by pid.
+	lines = []
+	for key, value in data.items():
+		if key == 'pid' or isinstance(value, str):
+			continue
+		name = f'{prefix}_{key}'
+		lines.append(f'# TYPE {name} {"counter" if key.endswith("_total") else "gauge"}')
+		lines.append(f'{name}{{pid="{data["pid"]}"}} {value}')
+	return '\n'.join(lines) + '\n'
+
+
+def init_pool_metrics(app, engine):
+	metrics = PoolMetrics(engine)
+	app.extensions['pool_metrics'] = metrics
+	return metrics
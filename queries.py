@@ -0,0 +1,251 @@
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+# Read-side query builders used by the controllers. Each helper issues a
+# fixed number of statements, whatever the size of the tables.
+#
+# The listings select only the columns they print and hand the template
+# generators of rows: nothing loads entities or builds a list the size of
+# the table. Rows are fetched STREAM_ROWS at a time, through a server-side
+# cursor on Postgres, while streaming.py sends the page.
+
+from collections import namedtuple
+from datetime import datetime, timezone
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy.orm import contains_eager
+
+from models import db, Venue, Artist, Show, Genre
+
+
+def has_genre(model, genre):
+	# EXISTS over the genre association table, served by its
+	# (genre_id, entity id) index.
+	return model.genres.any(Genre.name == genre)
+
+
+def linked_ids(fk_column, other_column, entity_id):
+	# Ids on the other side of an entity's shows, e.g. the artists that
+	# played a venue: linked_ids(Show.venue_id, Show.artist_id, venue_id).
+	return [row[0] for row in db.session.query(other_column).filter(
+		fk_column == entity_id).distinct()]
+
+
+STREAM_ROWS = 1000
+
+Area = namedtuple('Area', 'city state venues')
+
+
+def artist_names(genre=None):
+	# (id, name) rows of the artists, newest first, as a generator: the
+	# query only runs once the first row is asked for.
+	rows = db.session.query(Artist.id, Artist.name).order_by(Artist.id.desc())
+	if genre:
+		rows = rows.filter(has_genre(Artist, genre))
+	yield from rows.yield_per(STREAM_ROWS)
+
+
+def venue_areas(genre=None):
+	# Venues grouped by (city, state) with their upcoming show count,
+	# from a single query over the venue table, run once the first area is
+	# asked for. Yields Areas whose venues are (id, name,
+	# num_upcoming_shows) rows; each area's venues must be read before the
+	# next area.
+	rows = db.session.query(
+		Venue.id, Venue.name, Venue.upcoming_shows_count.label('num_upcoming_shows'),
+		Venue.city, Venue.state
+	).order_by(
+		Venue.state, Venue.city, Venue.id
+	)
+	if genre:
+		rows = rows.filter(has_genre(Venue, genre))
+
+	# Rows are ordered by state then city, so each area is contiguous.
+	for (state, city), venues in groupby(rows.yield_per(STREAM_ROWS), key=itemgetter(4, 3)):
+		yield Area(city, state, venues)
+
+
+def show_timeline(fk_column, entity_id, related, past_limit=None, now=None):
+	# Past and upcoming shows of a venue (fk_column=Show.venue_id,
+	# related=Show.Artist) or an artist (Show.artist_id, Show.Venue), with
+	# the other side eagerly loaded by the same query. When past_limit is
+	# set only the most recent past_limit past shows are loaded; the full
+	# counts come from window functions over the entity's shows, and the
+	# latest past show is always read so that past_limit=0 still has its count.
+	now = now or datetime.today()
+	is_past = Show.start_time < now
+	ranked = db.session.query(
+		Show.id.label('show_id'),
+		db.func.row_number().over(
+			partition_by=is_past, order_by=Show.start_time.desc()
+		).label('rank'),
+		db.func.count(Show.id).over(partition_by=is_past).label('total')
+	).filter(fk_column == entity_id).subquery()
+
+	query = db.session.query(Show, ranked.c.rank, ranked.c.total).join(
+		ranked, ranked.c.show_id == Show.id
+	).join(related).options(contains_eager(related)).order_by(
+		Show.start_time.desc(), Show.id.desc()
+	)
+	if past_limit is not None:
+		query = query.filter(db.or_(Show.start_time >= now, ranked.c.rank <= max(past_limit, 1)))
+
+	timeline = {"past": [], "upcoming": [], "past_count": 0, "upcoming_count": 0}
+	for show, rank, total in query:
+		if show.start_time < now:
+			if past_limit is None or rank <= past_limit:
+				timeline["past"].append(show)
+			timeline["past_count"] = total
+		else:
+			timeline["upcoming"].append(show)
+			timeline["upcoming_count"] = total
+	# Most recent first suits past shows; upcoming ones read soonest first.
+	timeline["upcoming"].reverse()
+
+	return timeline
+
+
+VENUE_FIELDS = ('id', 'name', 'genres', 'address', 'city', 'state', 'phone',
+	'website', 'facebook_link', 'seeking_talent', 'seeking_description', 'image_link')
+ARTIST_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'phone', 'website',
+	'facebook_link', 'seeking_venue', 'seeking_description', 'image_link')
+TIMELINE_FIELDS = ('past_shows', 'upcoming_shows', 'past_shows_count', 'upcoming_shows_count')
+
+
+def _entity_detail(entity, fields, timeline, prefix, related):
+	data = {field: getattr(entity, field) for field in fields if field != 'genres'}
+	if 'genres' in fields:
+		data["genres"] = entity.genre_names
+	if timeline is not None:
+		def show_data(show):
+			other = getattr(show, related)
+			return {
+				f"{prefix}_id": other.id,
+				f"{prefix}_name": other.name,
+				f"{prefix}_image_link": other.image_link,
+				"start_time": str(show.start_time)
+			}
+		data["past_shows"] = [show_data(show) for show in timeline["past"]]
+		data["upcoming_shows"] = [show_data(show) for show in timeline["upcoming"]]
+		data["past_shows_count"] = timeline["past_count"]
+		data["upcoming_shows_count"] = timeline["upcoming_count"]
+	return data
+
+
+def venue_detail(venue_id, past_limit=None, with_shows=True):
+	# Data of the venue page, or None if there is no such venue. The
+	# timeline query is skipped when with_shows is False.
+	venue = db.session.get(Venue, venue_id)
+	if venue is None:
+		return None
+	timeline = show_timeline(Show.venue_id, venue_id, Show.Artist,
+		past_limit=past_limit) if with_shows else None
+	return _entity_detail(venue, VENUE_FIELDS, timeline, 'artist', 'Artist')
+
+
+def artist_detail(artist_id, past_limit=None, with_shows=True):
+	# Data of the artist page, or None if there is no such artist.
+	artist = db.session.get(Artist, artist_id)
+	if artist is None:
+		return None
+	timeline = show_timeline(Show.artist_id, artist_id, Show.Venue,
+		past_limit=past_limit) if with_shows else None
+	return _entity_detail(artist, ARTIST_FIELDS, timeline, 'venue', 'Venue')
+
+
+def entity_page(model, fields, after=None, per_page=30, genre=None):
+	# One page of venues or artists ordered by id, selecting only the
+	# requested columns; 'num_upcoming_shows' reads the stored summary.
+	# Seeks past the `after` id rather than using OFFSET. Returns
+	# (rows, next cursor or None).
+	columns = [model.id] + [getattr(model, field) for field in fields
+		if field not in ('id', 'num_upcoming_shows')]
+	query = db.session.query(*columns)
+	if 'num_upcoming_shows' in fields:
+		query = query.add_columns(model.upcoming_shows_count.label('num_upcoming_shows'))
+	if genre:
+		query = query.filter(has_genre(model, genre))
+	if after is not None:
+		query = query.filter(model.id > after)
+
+	rows = query.order_by(model.id).limit(per_page + 1).all()
+	next_cursor = None
+	if len(rows) > per_page:
+		rows = rows[:per_page]
+		next_cursor = str(rows[-1].id)
+
+	return [{field: getattr(row, field) for field in fields} for row in rows], next_cursor
+
+
+def encode_cursor(start_time, show_id):
+	# Opaque ?after= cursor for the (start_time, id) keyset.
+	return f'{start_time.isoformat()}_{show_id}'
+
+
+def decode_cursor(cursor):
+	# Raises ValueError on a malformed cursor.
+	start_time, show_id = cursor.rsplit('_', 1)
+	return datetime.fromisoformat(start_time), int(show_id)
+
+
+def shows_page(after=None, per_page=30):
+	# One page of shows, newest first, seeking past the (start_time, id)
+	# of the `after` cursor instead of using OFFSET, so deep pages cost
+	# the same as the first. Venue and artist names come from the same
+	# joined query. Returns (shows, next cursor or None).
+	query = db.session.query(
+		Show.id, Show.start_time,
+		Venue.id, Venue.name,
+		Artist.id, Artist.name, Artist.image_link
+	).join(Venue, Show.venue_id == Venue.id).join(
+		Artist, Show.artist_id == Artist.id
+	).order_by(Show.start_time.desc(), Show.id.desc())
+	if after is not None:
+		query = query.filter(db.tuple_(Show.start_time, Show.id) < decode_cursor(after))
+
+	# One extra row tells whether there is a next page.
+	rows = query.limit(per_page + 1).all()
+	next_cursor = None
+	if len(rows) > per_page:
+		rows = rows[:per_page]
+		next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+
+	shows = [{
+		"venue_id": venue_id,
+		"venue_name": venue_name,
+		"artist_id": artist_id,
+		"artist_name": artist_name,
+		"artist_image_link": artist_image_link,
+		"start_time": str(start_time)
+	} for _, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in rows]
+
+	return shows, next_cursor
+
+
+def page_version(model, fk_column, other_model, other_fk, entity_id, now=None):
+	# What a venue or artist page depends on, from one aggregate query: the
+	# latest updated_at of the entity, its shows and the entities on the
+	# other side, and the start of the latest show that has already begun,
+	# since the page changes when a show moves from upcoming to past.
+	# Returns (last_modified as naive UTC, upcoming, total), or None when
+	# the entity does not exist.
+	now = now or datetime.today()
+	row = db.session.query(
+		model.updated_at,
+		db.func.max(Show.updated_at),
+		db.func.max(other_model.updated_at),
+		db.func.max(db.case((Show.start_time < now, Show.start_time))),
+		db.func.sum(db.case((Show.start_time >= now, 1), else_=0)),
+		db.func.count(Show.id)
+	).outerjoin(Show, fk_column == model.id).outerjoin(
+		other_model, other_model.id == other_fk
+	).filter(model.id == entity_id).group_by(model.id, model.updated_at).first()
+	if row is None:
+		return None
+
+	stamps = [stamp for stamp in row[:3] if stamp is not None]
+	if row[3] is not None:
+		# start_time is naive local time, like datetime.today().
+		stamps.append(row[3].astimezone(timezone.utc).replace(tzinfo=None))
+	return max(stamps), row[4] or 0, row[5]
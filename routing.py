@@ -0,0 +1,108 @@
+#----------------------------------------------------------------------------#
+# Read replica routing.
+#----------------------------------------------------------------------------#
+# Replicas are extra binds ('replica_0', 'replica_1', ...) built from
+# DB_REPLICA_URLS. The session sends a request's statements to one of them
+# when all of these hold:
+#
+#   * the request is a GET/HEAD, or its view is marked @replica_reads
+#     (the search forms post but only read),
+#   * the session has not flushed or executed a write yet,
+#   * the visitor did not write in the last REPLICA_PIN_SECONDS: after a
+#     create, edit or delete the redirected page and the next few are read
+#     from the primary, so nobody misses their own change to replica lag.
+#
+# Anything else, CLI commands included, uses the primary, and so do the
+# page cache's misses (cache.cached_page).
+
+import random
+import time
+
+from flask import current_app, g, has_request_context, request, session
+from sqlalchemy import event, orm
+
+try:
+	from flask_sqlalchemy.session import Session as BaseSession
+except ImportError:
+	# Flask-SQLAlchemy 2.x
+	from flask_sqlalchemy import SignallingSession as BaseSession
+from flask_sqlalchemy import SQLAlchemy
+
+PIN_KEY = '_db_primary_until'
+
+
+class RoutingSession(BaseSession):
+
+	def get_bind(self, *args, **kwargs):
+		# An explicit bind (bind_arguments={'bind': db.engine}) wins.
+		replica = self._replica() if kwargs.get('bind') is None else None
+		if replica is not None:
+			return replica
+		return super().get_bind(*args, **kwargs)
+
+	def _replica(self):
+		if (self._flushing or self.info.get('wrote') or not has_request_context()
+				or not g.get('db_replica')):
+			return None
+		engine = self.info.get('replica')
+		if engine is None:
+			# One replica per session, so a request reads one snapshot.
+			engine = self.info['replica'] = random.choice(current_app.extensions['replicas'])
+		return engine
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _pin_after_flush(session, flush_context):
+	session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _pin_on_dml(orm_execute_state):
+	# Core INSERT/UPDATE/DELETE through session.execute() don't flush.
+	if not orm_execute_state.is_select:
+		orm_execute_state.session.info['wrote'] = True
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+	def __init__(self, **kwargs):
+		kwargs.setdefault('session_options', {})['class_'] = RoutingSession
+		super().__init__(**kwargs)
+
+	def create_session(self, options):
+		# Flask-SQLAlchemy 2.x picks the session class here; 3.x reads
+		# session_options['class_'] and never calls this.
+		options = {key: value for key, value in options.items() if key != 'class_'}
+		return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def replica_reads(view):
+	# Lets a non-GET view that only reads use the replicas.
+	view.replica_reads = True
+	return view
+
+
+def init_routing(app, db):
+	binds = app.config.get('REPLICA_BINDS')
+	if not binds:
+		return
+	with app.app_context():
+		engines = getattr(db, 'engines', None)
+		if engines is not None:
+			app.extensions['replicas'] = [engines[bind] for bind in binds]
+		else:
+			# Flask-SQLAlchemy 2.x
+			app.extensions['replicas'] = [db.get_engine(bind=bind) for bind in binds]
+
+	@app.before_request
+	def route_reads():
+		view = app.view_functions.get(request.endpoint)
+		reads = request.method in ('GET', 'HEAD') or getattr(view, 'replica_reads', False)
+		g.db_replica = reads and session.get(PIN_KEY, 0) < time.time()
+
+	@app.after_request
+	def pin_writers(response):
+		view = app.view_functions.get(request.endpoint)
+		if request.method not in ('GET', 'HEAD') and not getattr(view, 'replica_reads', False):
+			session[PIN_KEY] = time.time() + app.config['REPLICA_PIN_SECONDS']
+		return response
@@ -0,0 +1,250 @@
+#----------------------------------------------------------------------------#
+# Scheduling.
+#----------------------------------------------------------------------------#
+# Answers "is this slot free?", "when is venue X free this week?" and "what
+# does this clash with?" over show intervals [start_time, end_time).
+#
+# Two backends share one interface:
+#
+#   * SqlSchedule asks the database. On Postgres the overlap test is a
+#     tsrange && lookup on the GiST exclusion constraints of the show table;
+#     elsewhere it is a bounded range scan on the (venue_id|artist_id,
+#     start_time) indexes, shows being at most MAX_DURATION long.
+#   * MemorySchedule keeps one IntervalTree per venue and artist, loaded
+#     from the show table with a single query. It is for tests and single
+#     process development servers (SCHEDULE_BACKEND = 'memory').
+#
+# On Postgres the exclusion constraints make booking race-free; on other
+# databases book() checks for overlaps first and the unique indexes only
+# guard identical start times.
+
+import random
+from collections import namedtuple
+from datetime import timedelta
+
+from flask import current_app
+
+from models import db, Show, DEFAULT_SHOW_DURATION
+
+MAX_DURATION = timedelta(hours=24)
+
+Booking = namedtuple('Booking', 'show_id venue_id artist_id start_time end_time')
+
+BOOKING_COLUMNS = (Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+
+
+#  Interval tree
+#  ----------------------------------------------------------------
+
+class _Node:
+	__slots__ = ('start', 'end', 'value', 'priority', 'max_end', 'left', 'right')
+
+	def __init__(self, start, end, value, priority):
+		self.start = start
+		self.end = end
+		self.value = value
+		self.priority = priority
+		self.max_end = end
+		self.left = None
+		self.right = None
+
+
+def _update(node):
+	node.max_end = node.end
+	for child in (node.left, node.right):
+		if child is not None and child.max_end > node.max_end:
+			node.max_end = child.max_end
+
+
+def _rotate_right(node):
+	child = node.left
+	node.left, child.right = child.right, node
+	_update(node)
+	_update(child)
+	return child
+
+
+def _rotate_left(node):
+	child = node.right
+	node.right, child.left = child.left, node
+	_update(node)
+	_update(child)
+	return child
+
+
+def _insert(node, new):
+	if node is None:
+		return new
+	if new.start < node.start:
+		node.left = _insert(node.left, new)
+		if node.left.priority > node.priority:
+			return _rotate_right(node)
+	else:
+		node.right = _insert(node.right, new)
+		if node.right.priority > node.priority:
+			return _rotate_left(node)
+	_update(node)
+	return node
+
+
+class IntervalTree:
+	# Treap ordered by start, each node carrying the latest end of its
+	# subtree: add() is O(log n) and overlapping() O(log n + k), expected.
+	# Intervals are half-open, so back-to-back slots don't overlap.
+
+	def __init__(self, seed=None):
+		self._root = None
+		self._size = 0
+		self._random = random.Random(seed)
+
+	def __len__(self):
+		return self._size
+
+	def add(self, start, end, value=None):
+		self._root = _insert(self._root, _Node(start, end, value, self._random.random()))
+		self._size += 1
+
+	def overlapping(self, start, end):
+		# Values of the intervals overlapping [start, end), by start.
+		found = []
+		self._collect(self._root, start, end, found)
+		return found
+
+	def _collect(self, node, start, end, found):
+		# Subtrees ending before `start` are skipped; so is everything
+		# right of a node starting at or after `end`.
+		while node is not None and node.max_end > start:
+			self._collect(node.left, start, end, found)
+			if node.start >= end:
+				return
+			if node.end > start:
+				found.append(node.value)
+			node = node.right
+
+
+def busy_trees(venue_ids, artist_ids, start, end):
+	# Interval trees of the bookings of these venues and artists around
+	# [start, end), keyed ('venue', id) and ('artist', id), in one query.
+	trees = {('venue', venue_id): IntervalTree() for venue_id in venue_ids}
+	trees.update({('artist', artist_id): IntervalTree() for artist_id in artist_ids})
+	if not trees:
+		return trees
+	rows = db.session.query(*BOOKING_COLUMNS).filter(
+		db.or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids)),
+		Show.start_time < end, Show.start_time > start - MAX_DURATION, Show.end_time > start)
+	for row in rows:
+		booking = Booking(*row)
+		for key in (('venue', booking.venue_id), ('artist', booking.artist_id)):
+			if key in trees:
+				trees[key].add(booking.start_time, booking.end_time, booking)
+	return trees
+
+
+#  Schedules
+#  ----------------------------------------------------------------
+
+class Schedule:
+	# Backends implement busy(kind, entity_id, start, end): the bookings of
+	# one venue or artist overlapping [start, end), by start time.
+
+	def conflicts(self, venue_id, artist_id, start, end):
+		clashes = self.busy('venue', venue_id, start, end)
+		clashes += [booking for booking in self.busy('artist', artist_id, start, end)
+			if booking.venue_id != venue_id]
+		return clashes
+
+	def is_free(self, venue_id, artist_id, start, end):
+		return not self.conflicts(venue_id, artist_id, start, end)
+
+	def free_slots(self, kind, entity_id, start, end, duration=DEFAULT_SHOW_DURATION, limit=None):
+		# (start, end) gaps of at least `duration` between the bookings of
+		# one venue or artist within [start, end).
+		slots = []
+		cursor = start
+		for booking in self.busy(kind, entity_id, start, end) + [Booking(None, None, None, end, end)]:
+			if booking.start_time - cursor >= duration:
+				slots.append((cursor, booking.start_time))
+				if limit is not None and len(slots) == limit:
+					break
+			cursor = max(cursor, booking.end_time)
+		return slots
+
+	def add(self, booking):
+		# Called once a booking has been committed.
+		pass
+
+	def reset(self):
+		# Called after shows were changed in bulk or deleted.
+		pass
+
+
+class SqlSchedule(Schedule):
+
+	def busy(self, kind, entity_id, start, end):
+		column = Show.venue_id if kind == 'venue' else Show.artist_id
+		query = db.session.query(*BOOKING_COLUMNS).filter(column == entity_id)
+		if db.session.get_bind().dialect.name == 'postgresql':
+			query = query.filter(db.func.tsrange(Show.start_time, Show.end_time).op('&&')(
+				db.func.tsrange(start, end)))
+		else:
+			query = query.filter(Show.start_time < end,
+				Show.start_time > start - MAX_DURATION, Show.end_time > start)
+		return [Booking(*row) for row in query.order_by(Show.start_time)]
+
+
+class MemorySchedule(Schedule):
+
+	def __init__(self):
+		self._trees = None
+
+	def _load(self):
+		trees = {}
+		for row in db.session.query(*BOOKING_COLUMNS):
+			booking = Booking(*row)
+			self._index(trees, booking)
+		return trees
+
+	def _index(self, trees, booking):
+		for key in (('venue', booking.venue_id), ('artist', booking.artist_id)):
+			tree = trees.get(key)
+			if tree is None:
+				tree = trees[key] = IntervalTree()
+			tree.add(booking.start_time, booking.end_time, booking)
+
+	def busy(self, kind, entity_id, start, end):
+		if self._trees is None:
+			self._trees = self._load()
+		tree = self._trees.get((kind, entity_id))
+		return tree.overlapping(start, end) if tree is not None else []
+
+	def add(self, booking):
+		if self._trees is not None:
+			self._index(self._trees, booking)
+
+	def reset(self):
+		self._trees = None
+
+
+def init_schedule(app):
+	backend = MemorySchedule() if app.config.get('SCHEDULE_BACKEND') == 'memory' else SqlSchedule()
+	app.extensions['schedule'] = backend
+	return backend
+
+
+def get_schedule():
+	return current_app.extensions.get('schedule') or SqlSchedule()
+
+
+def book(venue_id, artist_id, start_time, end_time):
+	# Inserts a show unless the slot clashes with another booking of the
+	# venue or the artist. Returns (Booking, []) or (None, conflicts); the
+	# caller commits, then passes the booking to get_schedule().add().
+	schedule = get_schedule()
+	if db.session.get_bind().dialect.name != 'postgresql':
+		clashes = schedule.conflicts(venue_id, artist_id, start_time, end_time)
+		if clashes:
+			return None, clashes
+	show_id = Show.book(venue_id, artist_id, start_time, end_time)
+	if show_id is None:
+		return None, schedule.conflicts(venue_id, artist_id, start_time, end_time)
+	return Booking(show_id, venue_id, artist_id, start_time, end_time), []
@@ -0,0 +1,194 @@
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+# Venue and artist search on name, "city, state" and genres.
+#
+# On PostgreSQL the ILIKE filters are served by the pg_trgm GIN indexes
+# created in migrations 6f1c2d9e4b7a and d82a5c1f6e09, and hits are ranked
+# by trigram similarity. Other databases (SQLite for local runs) use an in-process
+# trigram index with the same matching and ranking rules.
+
+import re
+import threading
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, Venue, Artist, Genre, venue_genres, artist_genres
+from queries import STREAM_ROWS, has_genre
+
+# Association table column holding the entity id, per searchable model.
+GENRE_LINKS = {
+	Venue: venue_genres.c.venue_id,
+	Artist: artist_genres.c.artist_id,
+}
+
+
+def location_expr(model):
+	# Must stay identical to the indexed expression in the migration.
+	return model.city.concat(db.literal_column("', '")).concat(model.state)
+
+
+def search(model, term, genre=None):
+	# Returns {"count": ..., "data": (id, name, num_upcoming_shows) rows}
+	# ranked best match first, optionally restricted to one genre. data
+	# is an iterator, to be read once.
+	if db.engine.dialect.name == 'postgresql':
+		return _search_trigram(model, term, genre)
+	return _search_ngram(model, term, genre)
+
+
+def _columns(model):
+	return model.id, model.name, model.upcoming_shows_count.label('num_upcoming_shows')
+
+
+def _search_trigram(model, term, genre):
+	pattern = f'%{term}%'
+	link = GENRE_LINKS[model]
+	genre_rank = db.session.query(
+		db.func.max(db.func.similarity(Genre.name, term))
+	).join(link.table, link.table.c.genre_id == Genre.id).filter(
+		link == model.id
+	).correlate(model).scalar_subquery()
+	rank = db.func.greatest(
+		db.func.similarity(model.name, term),
+		db.func.similarity(location_expr(model), term),
+		db.func.coalesce(genre_rank, 0)
+	)
+	rows = db.session.query(
+		*_columns(model), db.func.count(model.id).over().label('total')
+	).filter(db.or_(
+		model.name.ilike(pattern),
+		location_expr(model).ilike(pattern),
+		model.genres.any(Genre.name.ilike(pattern))
+	))
+	if genre:
+		rows = rows.filter(has_genre(model, genre))
+
+	# The total comes with every row: read the first one for it and
+	# stream the rest.
+	rows = iter(rows.order_by(rank.desc(), model.id).yield_per(STREAM_ROWS))
+	first = next(rows, None)
+	if first is None:
+		return {"count": 0, "data": iter(())}
+	return {"count": first.total, "data": chain([first], rows)}
+
+
+def _search_ngram(model, term, genre):
+	ranked = _index_for(model).search(term)
+	if not ranked:
+		return {"count": 0, "data": iter(())}
+
+	rows = db.session.query(*_columns(model)).filter(
+		model.id.in_(ranked)
+	)
+	if genre:
+		rows = rows.filter(has_genre(model, genre))
+	rows = rows.all()
+	order = {e_id: position for position, e_id in enumerate(ranked)}
+	rows.sort(key=lambda row: order[row[0]])
+
+	return {"count": len(rows), "data": iter(rows)}
+
+
+#  In-process trigram index
+#  ----------------------------------------------------------------
+
+def trigrams(text):
+	# pg_trgm style: lower-cased alphanumeric words, each padded with two
+	# spaces in front and one behind.
+	grams = set()
+	for word in re.findall(r'[^\W_]+', text.lower()):
+		padded = f'  {word} '
+		grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+	return grams
+
+
+def similarity(left, right):
+	# Same definition as pg_trgm's similarity().
+	left, right = trigrams(left), trigrams(right)
+	if not left or not right:
+		return 0.0
+	return len(left & right) / len(left | right)
+
+
+class NgramIndex:
+	# Inverted index of raw 3-grams over the searchable text of each row,
+	# used to narrow substring matches down to a few candidates.
+
+	def __init__(self):
+		self.documents = {}
+		self.postings = {}
+
+	def add(self, doc_id, fields):
+		fields = [field.lower() for field in fields if field]
+		self.documents[doc_id] = fields
+		for field in fields:
+			for i in range(len(field) - 2):
+				self.postings.setdefault(field[i:i + 3], set()).add(doc_id)
+
+	def search(self, term):
+		# Ids of the documents with a field containing term, best first.
+		needle = term.lower()
+		grams = {needle[i:i + 3] for i in range(len(needle) - 2)}
+		if grams:
+			candidates = set.intersection(*[self.postings.get(g, set()) for g in grams])
+		else:
+			candidates = self.documents.keys()
+
+		hits = []
+		for doc_id in candidates:
+			fields = self.documents[doc_id]
+			if any(needle in field for field in fields):
+				rank = max(similarity(field, needle) for field in fields)
+				hits.append((-rank, doc_id))
+		return [doc_id for _, doc_id in sorted(hits)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(model):
+	with _indexes_lock:
+		index = _indexes.get(model)
+		if index is None:
+			link = GENRE_LINKS[model]
+			genres = {}
+			for e_id, name in db.session.query(link, Genre.name).join(
+					Genre, Genre.id == link.table.c.genre_id):
+				genres.setdefault(e_id, []).append(name)
+
+			index = NgramIndex()
+			rows = db.session.query(model.id, model.name, model.city, model.state)
+			for e_id, name, city, state in rows:
+				index.add(e_id, (name, f'{city}, {state}', *genres.get(e_id, ())))
+			_indexes[model] = index
+		return index
+
+
+def reset_index(model):
+	# For writes that bypass the ORM unit of work (bulk inserts).
+	with _indexes_lock:
+		_indexes.pop(model, None)
+
+
+@event.listens_for(Session, 'before_flush')
+def _track_changes(session, flush_context, instances):
+	changed = session.info.setdefault('search_changed', set())
+	changed.update(type(obj) for obj in (*session.new, *session.dirty, *session.deleted))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_indexes(session):
+	# A committed ORM write to an indexed model drops its index; the next
+	# search rebuilds it.
+	with _indexes_lock:
+		for model in session.info.pop('search_changed', ()):
+			_indexes.pop(model, None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changes(session):
+	session.info.pop('search_changed', None)
@@ -3,9 +3,39 @@ import os
 
 load_dotenv()
 
+# Signs sessions and CSRF tokens: the same value on every worker.
+SECRET_KEY = os.environ.get("SECRET_KEY")
+DEBUG = os.environ.get("FLASK_DEBUG", "0") == "1"
+
 DB_NAME = os.environ.get("DB_NAME")
 DB_USER = os.environ.get("DB_USER")
 DB_PASSWORD = os.environ.get("DB_PASSWORD")
 DB_PORT = os.environ.get("DB_PORT")
 DB_HOST = os.environ.get("DB_HOST")
-DB_DIALECT = os.environ.get("DB_DIALECT")
\ No newline at end of file
+DB_DIALECT = os.environ.get("DB_DIALECT")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL")
+# Pages are only cached by default when the workers can share the cache.
+CACHE_TYPE = os.environ.get("CACHE_TYPE", "redis" if CACHE_REDIS_URL else "null")
+# Connection pool, per worker process.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+# Milliseconds, 0 for no limit.
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", "0"))
+# Set to 1 when DB_HOST is a PgBouncer in transaction pooling mode.
+DB_PGBOUNCER = os.environ.get("DB_PGBOUNCER", "0") == "1"
+
+# Read replicas: comma-separated database URLs, none by default.
+DB_REPLICA_URLS = [url.strip() for url in os.environ.get("DB_REPLICA_URLS", "").split(",") if url.strip()]
+# Seconds a visitor keeps reading from the primary after a write.
+DB_REPLICA_PIN_SECONDS = int(os.environ.get("DB_REPLICA_PIN_SECONDS", "5"))
+
+# Venue and artist pages through asyncpg (async_queries.py), off by default.
+DB_ASYNC_READS = os.environ.get("DB_ASYNC_READS", "0") == "1"
+
+# Logging and instrumentation.
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Statements at least this slow (milliseconds) are logged.
+SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", "200"))
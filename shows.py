@@ -0,0 +1,148 @@
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+# Home page, what's on calendar, show listing and booking, and the cron
+# commands keeping the show summaries and the calendar current.
+
+from datetime import date, timedelta
+
+import click
+from flask import Blueprint, abort, current_app, flash, render_template, request
+
+from cache import cached_page, invalidate
+from forms import ShowForm
+from models import db, Venue, Artist
+from queries import shows_page
+from scheduling import get_schedule, book
+from streaming import stream_page
+from summaries import record_show, refresh as refresh_summaries, age as age_summaries
+from whats_on import calendar_days, sync as sync_calendar, refresh as refresh_calendar
+
+# cli_group=None keeps the commands top-level: `flask age-shows`.
+shows = Blueprint('shows', __name__, cli_group=None)
+
+
+@shows.route('/')
+@cached_page('calendar')
+def home():
+	# This week's shows, from the precomputed calendar.
+	return render_template('pages/home.html', days=calendar_days()[2])
+
+
+#  Calendar
+#  ----------------------------------------------------------------
+
+@shows.route('/calendar')
+@cached_page('calendar')
+def calendar():
+	# What's on by day, optionally in one city: ?city=&from=&to= (dates).
+	city = request.args.get('city', '').strip()
+	try:
+		start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+		end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+		start, end, days = calendar_days(city, start, end)
+	except ValueError:
+		abort(400)
+
+	return render_template('pages/calendar.html', days=days, city=city, start=start, end=end)
+
+
+#  Shows
+#  ----------------------------------------------------------------
+
+@shows.route('/shows')
+@cached_page('shows')
+def index():
+	# displays list of shows at /shows, one keyset page at a time:
+	# ?after=<cursor> continues from the previous page, ?per_page=N sets
+	# the page size (capped by MAX_SHOWS_PER_PAGE).
+	per_page = min(
+		request.args.get('per_page', current_app.config['SHOWS_PER_PAGE'], type=int),
+		current_app.config['MAX_SHOWS_PER_PAGE'])
+	try:
+		data, next_cursor = shows_page(
+			after=request.args.get('after'), per_page=max(per_page, 1))
+	except ValueError:
+		abort(400)
+
+	return stream_page('pages/shows.html', shows=data, next_cursor=next_cursor)
+
+@shows.route('/shows/create')
+def create_shows():
+	# renders form. do not touch.
+	form = ShowForm()
+	return render_template('forms/new_show.html', form=form)
+
+@shows.route('/shows/create', methods=['POST'])
+def create_show_submission():
+	# called to create new shows in the db, upon submitting new show listing form
+	form = ShowForm()
+
+	if form.validate_on_submit():
+		try:
+			venue_id = int(form.venue_id.data)
+			artist_id = int(form.artist_id.data)
+			start_time = form.start_time.data
+			end_time = start_time + timedelta(minutes=form.duration.data or 120)
+			# On Postgres the exclusion constraints of the show table decide,
+			# so two concurrent bookings of overlapping slots can't both win.
+			booking, clashes = book(venue_id, artist_id, start_time, end_time)
+			if booking is None:
+				clash = clashes[0] if clashes else None
+				if clash is not None and clash.venue_id == venue_id:
+					flash(f'An error occurred. That venue is booked from {clash.start_time} to {clash.end_time} !')
+				elif clash is not None:
+					flash(f'An error occurred. That artist plays elsewhere from {clash.start_time} to {clash.end_time} !')
+				else:
+					flash('An error occurred. Show could not be listed.')
+			else:
+				record_show(venue_id, artist_id, start_time)
+				sync_calendar('show_id', [booking.show_id])
+				db.session.commit()
+				get_schedule().add(booking)
+				invalidate(f'venue:{venue_id}', f'artist:{artist_id}', 'venues', 'shows', 'calendar')
+				# on successful db insert, flash success
+				flash('Show was successfully listed!')
+		except Exception as ev:
+			current_app.logger.exception('Show creation failed')
+			db.session.rollback()
+			flash('An error occurred. Show could not be listed.')
+
+		finally:
+			db.session.close()
+	else:
+		for field, message in form.errors.items():
+			flash(field + ' - ' + str(message), 'warning')
+		return render_template('forms/new_show.html', form=form)
+
+	return render_template('pages/home.html')
+
+
+#  Show summaries
+#  ----------------------------------------------------------------
+
+@shows.cli.command('age-shows')
+@click.option('--all', 'everything', is_flag=True,
+	help='Recompute every venue and artist, not only those with a started show.')
+def age_shows_command(everything):
+	"""Move started shows from upcoming to past in the show summaries."""
+	if everything:
+		refreshed = refresh_summaries(Venue) + refresh_summaries(Artist)
+	else:
+		refreshed = age_summaries()
+	db.session.commit()
+	if refreshed:
+		invalidate('venues', 'artists')
+	click.echo(f'{refreshed} summaries refreshed')
+
+
+#  Calendar refresh
+#  ----------------------------------------------------------------
+
+@shows.cli.command('refresh-calendar')
+def refresh_calendar_command():
+	"""Rebuild the what's on calendar from today on."""
+	entries = refresh_calendar()
+	db.session.commit()
+	invalidate('calendar')
+	click.echo(f'{entries} calendar entries')
@@ -0,0 +1,38 @@
+#----------------------------------------------------------------------------#
+# Streamed pages.
+#----------------------------------------------------------------------------#
+# stream_page() is render_template() for the large listings: the template
+# is rendered while the response is sent, reading the row generators of
+# queries.py, so the first bytes leave as soon as the first rows are read
+# and neither the rows nor the page are ever held whole. Output goes out in
+# chunks of about STREAM_BUFFER_CHARS rather than one per template fragment.
+#
+# The request and app contexts are pushed again around the rendering
+# (stream_with_context), so the session, g and url_for keep working in the
+# template; queries must start from the template, not the view, since the
+# session of the view is closed by then. The status line and headers are
+# sent first: an error halfway through can only cut the page short.
+
+from flask import Response, current_app, stream_with_context
+
+
+def _buffered(chunks, size):
+	buffer = []
+	length = 0
+	for chunk in chunks:
+		buffer.append(chunk)
+		length += len(chunk)
+		if length >= size:
+			yield ''.join(buffer)
+			buffer = []
+			length = 0
+	if buffer:
+		yield ''.join(buffer)
+
+
+def stream_page(template_name, **context):
+	app = current_app._get_current_object()
+	template = app.jinja_env.get_or_select_template(template_name)
+	app.update_template_context(context)
+	chunks = _buffered(template.generate(context), app.config.get('STREAM_BUFFER_CHARS', 8192))
+	return Response(stream_with_context(chunks), mimetype='text/html')
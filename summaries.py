@@ -0,0 +1,89 @@
+#----------------------------------------------------------------------------#
+# Show summaries.
+#----------------------------------------------------------------------------#
+# Venues and artists carry their own show summary, so listings and searches
+# read it off the entity row instead of counting shows per request:
+#
+#   upcoming_shows_count   shows starting at or after the last refresh
+#   next_show_time         earliest of those
+#   last_show_time         latest show that already started
+#
+# A booking updates both sides in place with one UPDATE each, in the
+# booking's transaction. Anything else that removes or moves shows calls
+# refresh() for the entities involved. As time passes, shows become past
+# without any write, so age() (`flask age-shows`, run from cron) refreshes
+# the entities whose next show has started: an indexed lookup on
+# next_show_time.
+#
+# Refreshes keep updated_at: the summary is derived data, not an edit.
+
+from datetime import datetime
+
+from models import db, Venue, Artist, Show
+
+SUMMARIES = {
+	Venue: Show.venue_id,
+	Artist: Show.artist_id,
+}
+
+
+def summary_values(model, fk_column, now):
+	# Correlated subqueries recomputing the summary columns of `model`.
+	def aggregate(expression, *criteria):
+		return db.session.query(expression).filter(
+			fk_column == model.id, *criteria).correlate(model).scalar_subquery()
+
+	return {
+		"upcoming_shows_count": aggregate(db.func.count(Show.id), Show.start_time >= now),
+		"next_show_time": aggregate(db.func.min(Show.start_time), Show.start_time >= now),
+		"last_show_time": aggregate(db.func.max(Show.start_time), Show.start_time < now),
+		"updated_at": model.updated_at,
+	}
+
+
+def refresh(model, ids=None, now=None):
+	# Recomputes the summaries of the given venue or artist ids, of every
+	# row when ids is None. Returns the number of rows updated.
+	now = now or datetime.today()
+	stmt = db.update(model).values(summary_values(model, SUMMARIES[model], now))
+	if ids is not None:
+		ids = list(ids)
+		if not ids:
+			return 0
+		stmt = stmt.where(model.id.in_(ids))
+	return db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+def record_show(venue_id, artist_id, start_time, now=None):
+	# Adds one new show to both summaries, without reading any show.
+	now = now or datetime.today()
+	for model, entity_id in ((Venue, venue_id), (Artist, artist_id)):
+		if start_time >= now:
+			values = {
+				"upcoming_shows_count": model.upcoming_shows_count + 1,
+				"next_show_time": db.case(
+					(model.next_show_time.is_(None), start_time),
+					(model.next_show_time > start_time, start_time),
+					else_=model.next_show_time)
+			}
+		else:
+			values = {
+				"last_show_time": db.case(
+					(model.last_show_time.is_(None), start_time),
+					(model.last_show_time < start_time, start_time),
+					else_=model.last_show_time)
+			}
+		values["updated_at"] = model.updated_at
+		db.session.execute(db.update(model).where(model.id == entity_id).values(values)
+			.execution_options(synchronize_session=False))
+
+
+def age(now=None):
+	# Moves started shows from upcoming to past. Returns the number of
+	# venues and artists refreshed.
+	now = now or datetime.today()
+	refreshed = 0
+	for model in SUMMARIES:
+		due = [row[0] for row in db.session.query(model.id).filter(model.next_show_time <= now)]
+		refreshed += refresh(model, due, now)
+	return refreshed
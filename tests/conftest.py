@@ -0,0 +1,95 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from benchmarks.datagen import generate
+from models import db, Venue, Artist
+from search import reset_index
+
+
+@pytest.fixture
+def app_settings():
+	# Overridden by tests (or parametrized) to configure the app fixture.
+	return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_settings):
+	# A fresh SQLite database per test, no page cache, no CSRF.
+	if app_settings.get('ASYNC_READS'):
+		# requirements-dev.txt
+		pytest.importorskip('aiosqlite')
+		pytest.importorskip('greenlet')
+	app = create_app(**{
+		'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+		'SQLALCHEMY_ENGINE_OPTIONS': {},
+		'TESTING': True,
+		'SECRET_KEY': 'test',
+		'WTF_CSRF_ENABLED': False,
+		'CACHE_TYPE': 'null',
+		'MIGRATE': False,
+		'SLOW_QUERY_MS': None,
+		'LOG_LEVEL': 'WARNING',
+		**app_settings
+	})
+	with app.app_context():
+		db.create_all()
+	# The search indexes are per process, not per app.
+	reset_index(Venue)
+	reset_index(Artist)
+	return app
+
+
+@pytest.fixture
+def client(app):
+	return app.test_client()
+
+
+@pytest.fixture
+def seed(app):
+	# seed(venues, artists, shows) refills the database with benchmarks.datagen.
+	def seed(venues, artists, shows):
+		with app.app_context():
+			db.drop_all()
+			db.create_all()
+			counts = generate(venues, artists, shows)
+		# Bulk inserts don't refresh the search indexes.
+		reset_index(Venue)
+		reset_index(Artist)
+		return counts
+	return seed
+
+
+@pytest.fixture
+def get(client):
+	# get(url) -> (status, body): streamed pages are read to the end and
+	# closed, so their queries have all run.
+	def get(url):
+		response = client.get(url)
+		try:
+			return response.status_code, response.get_data(as_text=True)
+		finally:
+			response.close()
+	return get
+
+
+@pytest.fixture
+def count_queries(app):
+	# with count_queries() as queries: ... -> queries['count'] statements.
+	@contextmanager
+	def count_queries():
+		queries = {'count': 0}
+
+		def before_cursor_execute(*args):
+			queries['count'] += 1
+
+		with app.app_context():
+			engine = db.engine
+		event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+		try:
+			yield queries
+		finally:
+			event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+	return count_queries
@@ -0,0 +1,222 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from cache import LRUCache, RedisCache
+from models import db, Venue, Artist, Show
+from whats_on import sync as sync_calendar
+
+
+class Clock:
+	# A monotonic clock the tests move by hand.
+
+	def __init__(self):
+		self.now = 0
+
+	def __call__(self):
+		return self.now
+
+
+class StandInRedis:
+	# The Redis commands RedisCache uses, over a dict: values must be bytes
+	# and set(ex=) expires keys on the given clock.
+
+	def __init__(self, clock):
+		self.clock = clock
+		self.data = {}
+
+	def get(self, key):
+		value, expires = self.data.get(key, (None, None))
+		if expires is not None and expires <= self.clock():
+			del self.data[key]
+			return None
+		return value
+
+	def mget(self, keys):
+		return [self.get(key) for key in keys]
+
+	def set(self, key, value, ex=None):
+		assert isinstance(value, bytes)
+		self.data[key] = (value, None if ex is None else self.clock() + ex)
+
+	def delete(self, key):
+		self.data.pop(key, None)
+
+
+def test_lru_entries_expire_after_their_ttl():
+	clock = Clock()
+	cache = LRUCache(default_ttl=60, clock=clock)
+	cache.set('page', 'body')
+	cache.set('short', 'body', ttl=5)
+	cache.set('tag', 'version', ttl=0)
+
+	clock.now = 5
+	assert cache.get_many(['page', 'short', 'tag']) == ['body', None, 'version']
+	clock.now = 60
+	assert cache.get_many(['page', 'tag']) == [None, 'version']
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+	cache = LRUCache(max_entries=2, clock=Clock())
+	cache.set('a', 1)
+	cache.set('b', 2)
+	assert cache.get_many(['a']) == [1]
+	cache.set('c', 3)
+	assert cache.get_many(['a', 'b', 'c']) == [1, None, 3]
+	cache.delete('a')
+	assert cache.get_many(['a', 'c']) == [None, 3]
+
+
+def test_redis_cache_against_a_stand_in():
+	clock = Clock()
+	client = StandInRedis(clock)
+	cache = RedisCache(client, default_ttl=60)
+	cache.set('page', {'body': 'text'})
+	cache.set('tag', 'version', ttl=0)
+	assert set(client.data) == {'fyyur:page', 'fyyur:tag'}
+	assert cache.get_many(['page', 'tag', 'missing']) == [{'body': 'text'}, 'version', None]
+
+	clock.now = 60
+	assert cache.get_many(['page', 'tag']) == [None, 'version']
+	cache.delete('tag')
+	assert cache.get_many(['tag']) == [None]
+
+
+@pytest.fixture
+def app_settings():
+	return {'CACHE_TYPE': 'lru'}
+
+
+@pytest.fixture(params=['lru', 'redis'])
+def cached(request, app):
+	# The page cache of the app, in-process or Redis through the stand-in.
+	if request.param == 'redis':
+		app.extensions['page_cache'] = RedisCache(StandInRedis(Clock()))
+	return app.extensions['page_cache']
+
+
+@pytest.fixture
+def playing(app):
+	# Rose Hall and Pine Hall; The Owls play Rose Hall tomorrow night, The
+	# Larks have no show yet.
+	with app.app_context():
+		db.session.add_all([
+			Venue(name='Rose Hall', city='Portland', state='OR', seeking_talent=False),
+			Venue(name='Pine Hall', city='Portland', state='OR', seeking_talent=False),
+			Artist(name='The Owls', city='Portland', state='OR', seeking_venue=False),
+			Artist(name='The Larks', city='Portland', state='OR', seeking_venue=False),
+		])
+		db.session.flush()
+		start_time = datetime.combine(date.today() + timedelta(days=1), time(20))
+		db.session.add(Show(venue_id=1, artist_id=1, start_time=start_time,
+			end_time=start_time + timedelta(hours=2)))
+		db.session.flush()
+		sync_calendar('venue_id', [1])
+		db.session.commit()
+	return start_time
+
+
+def test_cache_hits_skip_the_database(cached, playing, get, count_queries):
+	for url in ('/', '/shows'):
+		status, body = get(url)
+		assert status == 200 and 'The Owls' in body
+		with count_queries() as queries:
+			assert get(url) == (status, body)
+		assert queries['count'] == 0
+
+
+def test_booking_a_show_refreshes_its_pages(cached, playing, client, get):
+	pages = ('/venues/2', '/artists/2', '/shows', '/')
+	for url in pages:
+		assert get(url)[0] == 200
+
+	response = client.post('/shows/create', data={'venue_id': 2, 'artist_id': 2,
+		'start_time': (playing + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')})
+	assert 'Show was successfully listed!' in response.get_data(as_text=True)
+
+	# Readers never see the pages of before the commit.
+	assert 'The Larks' in get('/venues/2')[1]
+	assert 'Pine Hall' in get('/artists/2')[1]
+	for url in ('/shows', '/'):
+		body = get(url)[1]
+		assert 'The Larks' in body and 'Pine Hall' in body
+
+
+def test_editing_an_artist_refreshes_their_venues_pages(cached, playing, client, get):
+	pages = ('/venues/1', '/shows', '/')
+	for url in pages:
+		assert 'The Owls' in get(url)[1]
+
+	response = client.post('/artists/1/edit', data={
+		'name': 'The Barn Owls', 'city': 'Portland', 'state': 'OR', 'phone': '503-555-0100',
+		'genres': ['Jazz'], 'image_link': 'https://example.com/a.png',
+		'facebook_link': 'https://facebook.com/a', 'website_link': 'https://example.com',
+		'seeking_description': ''})
+	assert response.status_code == 302
+	# The redirect target carries the flash and bypasses the cache.
+	get(response.location)
+
+	for url in pages:
+		assert 'The Barn Owls' in get(url)[1]
+
+
+def fetch(client, url, **headers):
+	response = client.get(url, headers=headers)
+	response.get_data()
+	response.close()
+	return response
+
+
+@pytest.mark.parametrize('url', ['/venues/1', '/artists/1'])
+def test_unchanged_pages_get_a_304(playing, client, url):
+	page = fetch(client, url)
+	assert page.status_code == 200
+	assert page.headers['ETag'] and page.headers['Last-Modified']
+
+	response = fetch(client, url, **{'If-None-Match': page.headers['ETag']})
+	assert response.status_code == 304 and response.data == b''
+	assert response.headers['ETag'] == page.headers['ETag']
+	response = fetch(client, url, **{'If-Modified-Since': page.headers['Last-Modified']})
+	assert response.status_code == 304
+
+	earlier = page.last_modified - timedelta(hours=1)
+	response = fetch(client, url, **{'If-Modified-Since': earlier.strftime('%a, %d %b %Y %H:%M:%S GMT')})
+	assert response.status_code == 200
+	assert fetch(client, url, **{'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_editing_a_venue_changes_the_etags_of_its_pages(playing, client):
+	etags = {url: fetch(client, url).headers['ETag'] for url in ('/venues/1', '/artists/1')}
+	response = client.post('/venues/1/edit', data={
+		'name': 'Briar Hall', 'city': 'Portland', 'state': 'OR', 'address': '1 Main Street',
+		'phone': '503-555-0100', 'genres': ['Jazz'], 'image_link': 'https://example.com/a.png',
+		'facebook_link': 'https://facebook.com/a', 'website_link': 'https://example.com',
+		'seeking_description': ''})
+	assert response.status_code == 302
+	fetch(client, response.location)
+
+	for url, etag in etags.items():
+		response = fetch(client, url, **{'If-None-Match': etag})
+		assert response.status_code == 200
+		assert response.headers['ETag'] != etag
+		assert 'Briar Hall' in response.get_data(as_text=True)
+
+
+@pytest.mark.parametrize('url', ['/venues/1', '/artists/1'])
+def test_pages_change_when_a_show_becomes_past(playing, client, monkeypatch, url):
+	page = fetch(client, url)
+	assert '1 Upcoming Show' in page.get_data(as_text=True)
+
+	class Later(datetime):
+		@classmethod
+		def today(cls):
+			return playing + timedelta(hours=1)
+
+	monkeypatch.setattr('queries.datetime', Later)
+	# Nothing was written, yet neither the client's copy nor the cached
+	# page may be served.
+	response = fetch(client, url, **{'If-None-Match': page.headers['ETag']})
+	assert response.status_code == 200
+	assert response.headers['ETag'] != page.headers['ETag']
+	body = response.get_data(as_text=True)
+	assert '0 Upcoming Shows' in body and '1 Past Show' in body
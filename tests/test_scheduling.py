@@ -0,0 +1,114 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduling import Booking, IntervalTree, MemorySchedule, Schedule, SqlSchedule
+
+
+def brute_force(intervals, start, end):
+	return sorted(value for value, (s, e) in enumerate(intervals) if s < end and e > start)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_overlapping_matches_brute_force(seed):
+	rnd = random.Random(seed)
+	intervals = []
+	tree = IntervalTree(seed=seed)
+	for value in range(rnd.randint(0, 200)):
+		start = rnd.randint(0, 1000)
+		end = start + rnd.randint(1, 100)
+		intervals.append((start, end))
+		tree.add(start, end, value)
+	assert len(tree) == len(intervals)
+
+	for _ in range(200):
+		start = rnd.randint(-50, 1100)
+		end = start + rnd.randint(1, 200)
+		found = tree.overlapping(start, end)
+		assert sorted(found) == brute_force(intervals, start, end)
+		starts = [intervals[value][0] for value in found]
+		assert starts == sorted(starts)
+
+
+def test_back_to_back_slots_do_not_overlap():
+	tree = IntervalTree(seed=0)
+	tree.add(10, 20, 'first')
+	tree.add(20, 30, 'second')
+	assert tree.overlapping(20, 30) == ['second']
+	assert tree.overlapping(10, 20) == ['first']
+	assert tree.overlapping(19, 21) == ['first', 'second']
+	assert tree.overlapping(0, 10) == []
+	assert tree.overlapping(30, 40) == []
+
+
+class TreeSchedule(Schedule):
+	# A schedule over fixed (start, end) bookings of venue 1.
+
+	def __init__(self, *intervals):
+		self.tree = IntervalTree(seed=0)
+		for start, end in intervals:
+			self.tree.add(start, end, Booking(None, 1, None, start, end))
+
+	def busy(self, kind, entity_id, start, end):
+		return self.tree.overlapping(start, end)
+
+
+MONDAY = datetime(2030, 1, 7)
+HOUR = timedelta(hours=1)
+
+
+def at(hours):
+	return MONDAY + hours * HOUR
+
+
+def test_free_slots_of_an_empty_window():
+	assert TreeSchedule().free_slots('venue', 1, at(0), at(24), 2 * HOUR) == [(at(0), at(24))]
+
+
+def test_free_slots_at_the_window_edges():
+	schedule = TreeSchedule(
+		(at(-1), at(1)),    # started before the window
+		(at(4), at(6)),
+		(at(23), at(25)),   # runs past the window
+	)
+	assert schedule.free_slots('venue', 1, at(0), at(24), 2 * HOUR) == [
+		(at(1), at(4)), (at(6), at(23))]
+
+
+def test_free_slots_ignore_bookings_touching_the_window():
+	# Half-open intervals: a booking ending as the window starts, or one
+	# starting as it ends, leaves the whole window free.
+	schedule = TreeSchedule((at(-2), at(0)), (at(24), at(26)))
+	assert schedule.free_slots('venue', 1, at(0), at(24), 2 * HOUR) == [(at(0), at(24))]
+
+
+def test_free_slots_need_the_whole_duration():
+	schedule = TreeSchedule((at(0), at(2)), (at(4), at(6)), (at(7), at(9)))
+	slots = schedule.free_slots('venue', 1, at(0), at(10), 2 * HOUR)
+	# The 2 hour gap fits exactly, the 1 hour gaps don't.
+	assert slots == [(at(2), at(4))]
+	assert schedule.free_slots('venue', 1, at(0), at(10), HOUR) == [
+		(at(2), at(4)), (at(6), at(7)), (at(9), at(10))]
+
+
+def test_free_slots_limit():
+	schedule = TreeSchedule((at(2), at(3)), (at(5), at(6)))
+	assert schedule.free_slots('venue', 1, at(0), at(10), HOUR, limit=2) == [
+		(at(0), at(2)), (at(3), at(5))]
+
+
+def test_memory_schedule_matches_sql_schedule(app, seed):
+	seed(venues=5, artists=10, shows=200)
+	with app.app_context():
+		sql, memory = SqlSchedule(), MemorySchedule()
+		now = datetime.today().replace(minute=0, second=0, microsecond=0)
+		for kind in ('venue', 'artist'):
+			for entity_id in range(1, 6):
+				for days in range(-30, 30, 7):
+					start = now + timedelta(days=days)
+					end = start + timedelta(days=7)
+					assert sorted(memory.busy(kind, entity_id, start, end)) == sorted(
+						sql.busy(kind, entity_id, start, end))
+					assert memory.free_slots(kind, entity_id, start, end) == sql.free_slots(
+						kind, entity_id, start, end)
@@ -0,0 +1,79 @@
+import pytest
+
+from models import db, Venue, Artist, Genre
+from search import NgramIndex, similarity, trigrams
+
+
+def test_trigrams_follow_pg_trgm():
+	assert trigrams('Cat') == {'  c', ' ca', 'cat', 'at '}
+	assert trigrams('a-b') == {'  a', ' a ', '  b', ' b '}
+	assert similarity('word', 'word') == 1.0
+	# pg_trgm: SELECT similarity('word', 'two words') = 0.363636
+	assert similarity('word', 'two words') == pytest.approx(4 / 11)
+	assert similarity('', 'word') == 0.0
+
+
+def test_ngram_index_matches_substrings_best_first():
+	index = NgramIndex()
+	index.add(1, ('The Musical Hop', 'San Francisco, CA'))
+	index.add(2, ('Park Square Live Music & Coffee', 'San Francisco, CA'))
+	index.add(3, ('The Dueling Pianos Bar', 'New York, NY', 'Classical'))
+	assert index.search('HOP') == [1]
+	assert sorted(index.search('music')) == [1, 2]
+	assert index.search('new york') == [3]
+	assert index.search('classic') == [3]
+	assert index.search('jazz') == []
+	# Terms shorter than a trigram are checked against every document.
+	assert sorted(index.search('ar')) == [2, 3]
+
+
+@pytest.fixture
+def venues(app):
+	with app.app_context():
+		jazz, rock = Genre(name='Jazz'), Genre(name='Rock n Roll')
+		db.session.add_all([
+			Venue(name='The Musical Hop', city='San Francisco', state='CA',
+				genres=[jazz], seeking_talent=False),
+			Venue(name='Park Square Live Music & Coffee', city='San Francisco', state='CA',
+				genres=[rock], seeking_talent=False),
+			Venue(name='The Dueling Pianos Bar', city='New York', state='NY',
+				genres=[jazz, rock], seeking_talent=False),
+		])
+		db.session.commit()
+
+
+def venue_names(client, term, **form):
+	response = client.post('/venues/search', data={'search_term': term, **form})
+	assert response.status_code == 200
+	body = response.get_data(as_text=True)
+	return [name for name in ('The Musical Hop', 'Park Square Live Music &amp; Coffee',
+		'The Dueling Pianos Bar') if name in body]
+
+
+def test_venue_search_is_partial_and_case_insensitive(client, venues):
+	assert venue_names(client, 'hop') == ['The Musical Hop']
+	assert venue_names(client, 'Music') == ['The Musical Hop', 'Park Square Live Music &amp; Coffee']
+
+
+def test_venue_search_covers_location_and_genres(client, venues):
+	assert venue_names(client, 'new york, ny') == ['The Dueling Pianos Bar']
+	assert venue_names(client, 'jazz') == ['The Musical Hop', 'The Dueling Pianos Bar']
+	assert venue_names(client, 'San Francisco', genre='Rock n Roll') == [
+		'Park Square Live Music &amp; Coffee']
+
+
+def test_venue_search_counts_hits(client, venues):
+	body = client.post('/venues/search', data={'search_term': 'music'}).get_data(as_text=True)
+	assert '"music": 2' in body
+
+
+def test_search_sees_committed_writes(app, client):
+	assert '"band": 0' in client.post('/artists/search', data={'search_term': 'band'}).get_data(
+		as_text=True)
+	with app.app_context():
+		db.session.add(Artist(name='The Wild Sax Band', city='San Francisco', state='CA',
+			seeking_venue=False))
+		db.session.commit()
+	body = client.post('/artists/search', data={'search_term': 'band'}).get_data(as_text=True)
+	assert '"band": 1' in body
+	assert 'The Wild Sax Band' in body
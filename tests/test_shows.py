@@ -0,0 +1,140 @@
+from datetime import datetime
+
+import pytest
+
+from models import db, Venue, Artist, Show
+
+
+def all_shows(app):
+	# Every show as the listing prints it, newest first.
+	with app.app_context():
+		rows = db.session.query(Show.venue_id, Show.artist_id, Show.start_time).order_by(
+			Show.start_time.desc(), Show.id.desc())
+		return [(venue_id, artist_id, str(start_time)) for venue_id, artist_id, start_time in rows]
+
+
+def test_shows_pages_cover_every_show_once(app, client, seed):
+	# 3 venues and 4 artists over 60 shows: many shows share a start time,
+	# which the id part of the keyset tells apart.
+	seed(venues=3, artists=4, shows=60)
+	listed = []
+	cursor = None
+	while True:
+		query = '/api/v1/shows?per_page=7' + (f'&after={cursor}' if cursor else '')
+		body = client.get(query).get_json()
+		assert len(body['data']) <= 7
+		listed += [(show['venue_id'], show['artist_id'], show['start_time']) for show in body['data']]
+		cursor = body['next']
+		if cursor is None:
+			break
+	assert listed == all_shows(app)
+
+
+def test_deep_shows_page_costs_the_same_as_the_first(client, seed, count_queries):
+	seed(venues=20, artists=40, shows=500)
+	with count_queries() as first:
+		body = client.get('/api/v1/shows?per_page=10').get_json()
+	cursor = body['next']
+	for _ in range(30):
+		cursor = client.get(f'/api/v1/shows?per_page=10&after={cursor}').get_json()['next']
+	with count_queries() as deep:
+		body = client.get(f'/api/v1/shows?per_page=10&after={cursor}').get_json()
+	assert len(body['data']) == 10
+	assert deep['count'] == first['count']
+
+
+def test_shows_page_links_to_the_next_page(seed, get):
+	seed(venues=3, artists=4, shows=12)
+	status, body = get('/shows?per_page=5')
+	assert status == 200
+	assert body.count('/artists/') == 5
+	assert 'after=' in body
+
+	status, body = get('/shows?per_page=12')
+	assert body.count('/artists/') == 12
+	assert 'after=' not in body
+
+
+def test_shows_rejects_malformed_cursors(client):
+	assert client.get('/shows?after=yesterday').status_code == 400
+	assert client.get('/api/v1/shows?after=2030-01-01_x').status_code == 400
+	assert client.get(f'/api/v1/shows?after={datetime(2030, 1, 1).isoformat()}_1').status_code == 200
+
+
+@pytest.fixture
+def booked(app):
+	# Venues 1 and 2, artists 1 and 2; venue 1 and artist 1 play
+	# 2030-01-07 20:00 to 22:00.
+	with app.app_context():
+		db.session.add_all([
+			Venue(name='Rose Hall', city='Portland', state='OR', seeking_talent=False),
+			Venue(name='Pine Hall', city='Portland', state='OR', seeking_talent=False),
+			Artist(name='The Owls', city='Portland', state='OR', seeking_venue=False),
+			Artist(name='The Larks', city='Portland', state='OR', seeking_venue=False),
+		])
+		db.session.flush()
+		db.session.add(Show(venue_id=1, artist_id=1, start_time=datetime(2030, 1, 7, 20),
+			end_time=datetime(2030, 1, 7, 22)))
+		db.session.commit()
+
+
+def book(client, venue_id, artist_id, start_time, duration=120):
+	response = client.post('/shows/create', data={'venue_id': venue_id, 'artist_id': artist_id,
+		'start_time': start_time, 'duration': duration})
+	assert response.status_code == 200
+	return response.get_data(as_text=True)
+
+
+def show_times(app):
+	with app.app_context():
+		return [start_time for start_time, in db.session.query(Show.start_time).order_by(Show.id)]
+
+
+@pytest.mark.parametrize('start_time', ['2030-01-08 20:00', '2030-01-08 20:00:00'])
+def test_show_form_accepts_times_with_or_without_seconds(app, client, booked, start_time):
+	assert 'Show was successfully listed!' in book(client, 2, 2, start_time)
+	assert show_times(app)[-1] == datetime(2030, 1, 8, 20)
+
+
+def test_show_form_flashes_field_errors(app, client, booked):
+	body = book(client, 2, 2, 'tomorrow night')
+	assert 'start_time - ' in body
+	assert 'name="start_time"' in body
+	assert len(show_times(app)) == 1
+
+
+@pytest.mark.parametrize('venue_id, artist_id, start_time, clash', [
+	(1, 2, '2030-01-07 20:00', 'That venue is booked'),
+	(1, 2, '2030-01-07 21:00', 'That venue is booked'),
+	(1, 2, '2030-01-07 19:00', 'That venue is booked'),
+	(2, 1, '2030-01-07 21:30', 'That artist plays elsewhere'),
+])
+def test_overlapping_bookings_are_refused(app, client, booked, venue_id, artist_id, start_time, clash):
+	assert clash in book(client, venue_id, artist_id, start_time)
+	assert len(show_times(app)) == 1
+
+
+def test_back_to_back_bookings_are_accepted(app, client, booked):
+	assert 'Show was successfully listed!' in book(client, 1, 2, '2030-01-07 22:00')
+	assert 'Show was successfully listed!' in book(client, 1, 2, '2030-01-07 18:00')
+	assert len(show_times(app)) == 3
+
+
+def test_show_book_reports_taken_start_times(app, booked):
+	# The unique indexes reject the same start time without a lookup.
+	with app.app_context():
+		assert Show.book(1, 2, datetime(2030, 1, 7, 20), datetime(2030, 1, 7, 21)) is None
+		assert Show.book(2, 1, datetime(2030, 1, 7, 20), datetime(2030, 1, 7, 21)) is None
+		assert Show.book(2, 2, datetime(2030, 1, 7, 20), datetime(2030, 1, 7, 21)) is not None
+		db.session.commit()
+
+
+def test_shows_can_be_booked_at_venues_without_a_city(app, client):
+	with app.app_context():
+		db.session.add_all([
+			Venue(name='Nowhere Hall', seeking_talent=False),
+			Artist(name='The Owls', city='Portland', state='OR', seeking_venue=False),
+		])
+		db.session.commit()
+	assert 'Show was successfully listed!' in book(client, 1, 1, '2030-01-08 20:00')
+	assert len(show_times(app)) == 1
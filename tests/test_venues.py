@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Venue, Artist, Show
+
+
+def test_venues_page_queries_do_not_grow_with_venues(seed, get, count_queries):
+	counts = []
+	for size in (10, 100):
+		seed(venues=size, artists=2 * size, shows=10 * size)
+		with count_queries() as queries:
+			status, body = get('/venues')
+		assert status == 200
+		assert f'/venues/{size}"' in body
+		counts.append(queries['count'])
+	assert counts[0] == counts[1]
+
+
+def test_venues_page_keeps_same_named_cities_apart(app, get):
+	with app.app_context():
+		db.session.add_all([
+			Venue(name='Rose Hall', city='Portland', state='OR', seeking_talent=False),
+			Venue(name='Pine Hall', city='Portland', state='ME', seeking_talent=False),
+		])
+		db.session.commit()
+	status, body = get('/venues')
+	assert status == 200
+	assert body.index('Portland, ME') < body.index('Pine Hall') < body.index('Portland, OR') < body.index('Rose Hall')
+
+
+@pytest.mark.parametrize('app_settings', [{}, {'ASYNC_READS': True}], ids=['sync', 'async'])
+@pytest.mark.parametrize('past', [0, 1, 3])
+def test_venue_show_counts_ignore_past_limit(app, client, past):
+	now = datetime.today()
+	with app.app_context():
+		venue = Venue(name='Rose Hall', city='Portland', state='OR', seeking_talent=False)
+		artist = Artist(name='The Owls', city='Portland', state='OR', seeking_venue=False)
+		db.session.add_all([venue, artist])
+		db.session.flush()
+		for days in (-30, -20, -10, 10, 20):
+			start_time = now + timedelta(days=days)
+			db.session.add(Show(venue_id=venue.id, artist_id=artist.id,
+				start_time=start_time, end_time=start_time + timedelta(hours=2)))
+		db.session.commit()
+		venue_id = venue.id
+
+	data = client.get(f'/api/v1/venues/{venue_id}?past={past}').get_json()['data']
+	assert data['past_shows_count'] == 3
+	assert data['upcoming_shows_count'] == 2
+	assert len(data['past_shows']) == past
+	assert len(data['upcoming_shows']) == 2
@@ -0,0 +1,231 @@
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+# Listing, search, detail page, create, edit and delete.
+
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, redirect, render_template, request, url_for
+
+from cache import cached_page, conditional_page, invalidate
+from forms import VenueForm
+from models import db, Venue, Artist, Show, Genre
+from async_queries import venue_detail
+from queries import linked_ids, page_version, venue_areas
+from routing import replica_reads
+from scheduling import get_schedule
+from search import search
+from streaming import stream_page
+from summaries import refresh as refresh_summaries
+from whats_on import sync as sync_calendar
+
+venues = Blueprint('venues', __name__)
+
+
+@venues.route('/venues')
+@cached_page('venues')
+def index():
+	# Venues grouped by (city, state), with num_upcoming_shows aggregated
+	# in the same query. ?genre= narrows the list down to one genre.
+	data = venue_areas(genre=request.args.get('genre'))
+
+	return stream_page('pages/venues.html', areas=data)
+
+@venues.route('/venues/search', methods=['POST'])
+@replica_reads
+def search_venues():
+	# TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
+	# search for Hop should return "The Musical Hop".
+	# search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
+
+	# Matches on name, "city, state" or genres, best match first. A genre
+	# field restricts the hits to that genre.
+	response = search(Venue, request.form.get('search_term', ''),
+		genre=request.values.get('genre'))
+
+	return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+
+def venue_page_version(venue_id):
+	version = page_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id)
+	return version and (version, version[0])
+
+@venues.route('/venues/<int:venue_id>')
+@conditional_page(venue_page_version)
+@cached_page('venue:{venue_id}')
+def show_venue(venue_id):
+	# shows the venue page with the given venue_id
+	# TODO: replace with real venue data from the venues table, using venue_id
+	# Past and upcoming shows, with their artist, come from a single query.
+	# ?past=N only loads the N most recent past shows.
+	data = venue_detail(venue_id, past_limit=request.args.get('past', type=int))
+	error = data is None
+
+	if error is False:
+		return render_template('pages/show_venue.html', venue=data)
+	else:
+		return redirect(url_for('shows.home'))
+
+
+#  Create Venue
+#  ----------------------------------------------------------------
+
+@venues.route('/venues/create', methods=['GET'])
+def create_venue_form():
+	form = VenueForm()
+	return render_template('forms/new_venue.html', form=form)
+
+@venues.route('/venues/create', methods=['POST'])
+def create_venue_submission():
+	# TODO: insert form data as a new Venue record in the db, instead
+	form = VenueForm()
+
+	if form.validate_on_submit():
+		try:
+			# Checks if there is such a Venue already stored..
+			avenue_old = Venue.query.filter(
+				Venue.name.ilike(f"{request.form['name']}"),
+				Venue.city.ilike(f"{request.form['city']}")).first()
+
+			if avenue_old is not None:
+				flash('An error occurred. Venue ' + request.form['name'] + ' already exists.')
+			else:
+				# Hooray, new Venue to be stored..
+				bodyRequest = request.form
+				seek_talent = True if 'seeking_talent' in bodyRequest.keys() else False
+				venue = Venue(
+					name = bodyRequest['name'],
+					city = bodyRequest['city'],
+					state = bodyRequest['state'],
+					address = bodyRequest['address'],
+					phone = bodyRequest['phone'],
+					image_link = bodyRequest['image_link'],
+					facebook_link = bodyRequest['facebook_link'],
+					website = bodyRequest['website_link'],
+					seeking_talent = seek_talent,
+					seeking_description = bodyRequest['seeking_description'],
+					genres = Genre.resolve(bodyRequest.getlist('genres'))
+				)
+				db.session.add(venue)
+				db.session.commit()
+				invalidate('venues')
+
+				# on successful db insert, flash success..
+				flash('Venue ' + request.form['name'] + ' was successfully listed!')
+
+		except Exception as e:
+			db.session.rollback()
+			current_app.logger.exception('Venue creation failed')
+			# TODO: on unsuccessful db insert, flash an error instead.
+			flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.',
+				"error")
+			# see: http://flask.pocoo.org/docs/1.0/patterns/flashing/
+
+		finally:
+			db.session.close()
+
+		return render_template('pages/home.html')
+	else:
+		for field, message in form.errors.items():
+			flash(field + ' - ' + str(message), "error")
+			return render_template('forms/new_venue.html', form=form)
+
+
+@venues.route('/venues/<int:venue_id>', methods=['DELETE'])
+def delete_venue(venue_id):
+	# TODO: Complete this endpoint for taking a venue_id, and using
+	# SQLAlchemy ORM to delete a record. Handle cases where the session commit could fail.
+	element = None
+	try:
+		venue = Venue.query.get(venue_id)
+		element = venue.name
+		# Pages showing this venue: its own, the listings and the artists
+		# that played there.
+		artist_ids = linked_ids(Show.venue_id, Show.artist_id, venue_id)
+		tags = [f'artist:{a_id}' for a_id in artist_ids]
+		db.session.delete(venue)
+		db.session.flush()
+		refresh_summaries(Artist, artist_ids)
+		sync_calendar('venue_id', [venue_id])
+		db.session.commit()
+		get_schedule().reset()
+		invalidate(f'venue:{venue_id}', 'venues', 'shows', 'calendar', *tags)
+		flash(f"{element} deleted !")
+	except Exception as e:
+		current_app.logger.exception('Venue deletion failed')
+		db.session.rollback()
+		flash("Unable to delete !")
+	finally:
+		db.session.close()
+
+	# BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
+	# clicking that button delete it from the db then redirect the user to the homepage
+	return redirect(url_for('shows.home'))
+
+
+#  Update
+#  ----------------------------------------------------------------
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['GET'])
+def edit_venue(venue_id):
+	form = VenueForm()
+
+	# TODO: populate form with values from venue with ID <venue_id>
+	venue = {}
+	ven = Venue.query.get(venue_id)
+	venue["id"] = ven.id
+	venue["name"] = ven.name
+	venue["genres"] = ven.genre_names
+	venue["address"] = ven.address
+	venue["city"] = ven.city
+	venue["state"] = ven.state
+	venue["phone"] = ven.phone
+	venue["website"] = ven.website
+	venue["facebook_link"] = ven.facebook_link
+	venue["seeking_talent"] = ven.seeking_talent
+	venue["seeking_description"] = ven.seeking_description
+	venue["image_link"] = ven.image_link
+
+	return render_template('forms/edit_venue.html', form=form, venue=venue)
+
+@venues.route('/venues/<int:venue_id>/edit', methods=['POST'])
+def edit_venue_submission(venue_id):
+	# TODO: take values from the form submitted, and update existing
+	# venue record with ID <venue_id> using the new attributes
+	form = VenueForm()
+	venue = Venue.query.get(venue_id)
+	if form.validate_on_submit():
+		try:
+			bodyRequest = request.form
+			seek_talent = True if 'seeking_talent' in bodyRequest.keys() else False
+
+			venue.name = bodyRequest['name']
+			venue.city = bodyRequest['city']
+			venue.state = bodyRequest['state']
+			venue.address = bodyRequest['address']
+			venue.phone = bodyRequest['phone']
+			venue.image_link = bodyRequest['image_link']
+			venue.facebook_link = bodyRequest['facebook_link']
+			venue.website = bodyRequest['website_link']
+			venue.seeking_talent = seek_talent
+			venue.seeking_description = bodyRequest['seeking_description']
+			venue.genres = Genre.resolve(bodyRequest.getlist('genres'))
+			# A genre-only edit changes no column, so bump the version here.
+			venue.updated_at = datetime.utcnow()
+			tags = [f'artist:{a_id}' for a_id in linked_ids(Show.venue_id, Show.artist_id, venue_id)]
+			sync_calendar('venue_id', [venue_id])
+			db.session.commit()
+			invalidate(f'venue:{venue_id}', 'venues', 'shows', 'calendar', *tags)
+			flash("Successfully updated !")
+
+		except Exception as e:
+			current_app.logger.exception('Venue update failed')
+			db.session.rollback()
+			flash("Failed to update !")
+
+		finally:
+			db.session.close()
+		return redirect(url_for('venues.show_venue', venue_id=venue_id))
+	else:
+		for field, message in form.errors.items():
+			flash(field + ' - ' + str(message), 'warning')
+		return render_template('forms/edit_venue.html', form=form, venue=venue)
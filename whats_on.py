@@ -0,0 +1,96 @@
+#----------------------------------------------------------------------------#
+# What's on.
+#----------------------------------------------------------------------------#
+# The calendar of upcoming shows by day and city, read from the
+# calendar_entry table rather than from the show, venue and artist tables:
+# a page is one index range scan on (city_key, day) or (day).
+#
+# Entries are refreshed in place when shows, venues or artists are written
+# (sync(), in the writer's transaction) and rebuilt by `flask
+# refresh-calendar`, run from cron, which also drops the days gone by.
+# A rebuild is a single transaction, so readers keep seeing the previous
+# calendar until it commits and are never blocked by it.
+
+from datetime import date, datetime, time, timedelta
+from itertools import groupby
+
+from models import db, Show, Venue, Artist, CalendarEntry
+
+DEFAULT_DAYS = 7
+MAX_DAYS = 31
+
+ENTRY_COLUMNS = ('show_id', 'day', 'city_key', 'city', 'state', 'start_time',
+	'venue_id', 'venue_name', 'artist_id', 'artist_name', 'artist_image_link')
+
+# Entry column -> show column, for sync().
+SYNC_COLUMNS = {
+	'show_id': Show.id,
+	'venue_id': Show.venue_id,
+	'artist_id': Show.artist_id,
+}
+
+
+def _entries(today, *criteria):
+	# INSERT ... SELECT of the entries of the upcoming shows matching criteria.
+	select = db.select(
+		Show.id,
+		db.func.date(Show.start_time, type_=db.Date),
+		# Venue.city is nullable, city_key is not: no city keys as ''.
+		db.func.coalesce(db.func.lower(Venue.city), ''),
+		Venue.city, Venue.state, Show.start_time,
+		Venue.id, Venue.name,
+		Artist.id, Artist.name, Artist.image_link
+	).join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id).where(
+		Show.start_time >= datetime.combine(today, time.min), *criteria)
+	return db.insert(CalendarEntry).from_select(ENTRY_COLUMNS, select)
+
+
+def sync(column, ids, today=None):
+	# Rewrites the entries of the given show, venue or artist ids
+	# (column 'show_id', 'venue_id' or 'artist_id') after a write.
+	ids = list(ids)
+	if not ids:
+		return
+	today = today or date.today()
+	# The entries copy names from the venue and artist rows being written.
+	db.session.flush()
+	db.session.execute(db.delete(CalendarEntry).where(getattr(CalendarEntry, column).in_(ids)))
+	db.session.execute(_entries(today, SYNC_COLUMNS[column].in_(ids)))
+
+
+def refresh(today=None):
+	# Rebuilds the whole calendar from today on. Returns the entry count.
+	today = today or date.today()
+	db.session.execute(db.delete(CalendarEntry))
+	db.session.execute(_entries(today))
+	return db.session.query(db.func.count(CalendarEntry.show_id)).scalar()
+
+
+def calendar_days(city=None, start=None, end=None):
+	# (start, end, [{"day", "shows": [...]}]) for the days in [start, end]
+	# by start time, from a single query. The window defaults to a week
+	# from today and is cut to MAX_DAYS; ValueError if end < start.
+	start = start or date.today()
+	end = end or start + timedelta(days=DEFAULT_DAYS - 1)
+	if end < start:
+		raise ValueError('Calendar ends before it starts')
+	end = min(end, start + timedelta(days=MAX_DAYS - 1))
+	query = db.session.query(CalendarEntry).filter(
+		CalendarEntry.day >= start, CalendarEntry.day <= end)
+	if city:
+		query = query.filter(CalendarEntry.city_key == city.lower())
+	query = query.order_by(CalendarEntry.day, CalendarEntry.start_time, CalendarEntry.show_id)
+
+	return start, end, [{
+		"day": str(day),
+		"shows": [{
+			"venue_id": entry.venue_id,
+			"venue_name": entry.venue_name,
+			"artist_id": entry.artist_id,
+			"artist_name": entry.artist_name,
+			"artist_image_link": entry.artist_image_link,
+			"city": entry.city,
+			"state": entry.state,
+			"start_time": str(entry.start_time)
+		} for entry in entries]
+	} for day, entries in groupby(query, key=lambda entry: entry.day)]
@@ -0,0 +1,32 @@
+#----------------------------------------------------------------------------#
+# WSGI entry point.
+#----------------------------------------------------------------------------#
+#   gunicorn --preload -w 4 wsgi:app
+#
+# With --preload the master builds the app once, then forks the workers,
+# which share its memory copy-on-write instead of each importing and
+# building everything again. gc.freeze() moves what was built so far out of
+# the collector's reach, so collections in the workers don't write to (and
+# copy) those pages. create_app() opens no database connection: every
+# worker opens its own pool. SECRET_KEY must be set. Migrations run through `flask db`, so the
+# workers skip Flask-Migrate and Alembic.
+#
+# Pages are cached only with CACHE_REDIS_URL set, in Redis, shared by the
+# workers; CACHE_TYPE=lru keeps a cache per worker that the other workers'
+# writes don't invalidate, so it is no use here.
+#
+# With DB_ASYNC_READS=1 the venue and artist pages wait on an event loop
+# (async_queries.py) rather than a connection each, so threaded workers
+# keep many of them in flight:
+#
+#   DB_ASYNC_READS=1 gunicorn --preload -w 4 -k gthread --threads 16 wsgi:app
+
+import gc
+
+from app import create_app
+
+app = create_app(MIGRATE=False)
+if not app.config.get('SECRET_KEY'):
+	# Fail at boot rather than on every request.
+	raise RuntimeError('SECRET_KEY is not set')
+gc.freeze()